@@ -0,0 +1,93 @@
+"""
+Minute-resolution weekly availability calendars.
+
+A calendar is a boolean NumPy array with one slot per minute of the week (Mon 00:00 = 0),
+so intersecting, merging and subtracting calendars are single vectorized operations and
+a calendar converts directly into CP-SAT domains.
+"""
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+WEEK_MINUTES = 10080
+
+
+class WeeklyAvailability:
+    __slots__ = ("slots",)
+
+    def __init__(self, slots: np.ndarray = None):
+        self.slots = np.zeros(WEEK_MINUTES, dtype=bool) if slots is None else slots
+
+    @classmethod
+    def always(cls) -> "WeeklyAvailability":
+        return cls(np.ones(WEEK_MINUTES, dtype=bool))
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[int, int]]) -> "WeeklyAvailability":
+        """Half-open (from_minute, to_minute) intervals."""
+        # Mark interval bounds and integrate, avoids a Python loop over minutes
+        marks = np.zeros(WEEK_MINUTES + 1, dtype=np.int32)
+        for start, end in intervals:
+            start, end = max(start, 0), min(end, WEEK_MINUTES)
+            if start < end:
+                marks[start] += 1
+                marks[end] -= 1
+        return cls(np.cumsum(marks[:-1]) > 0)
+
+    @staticmethod
+    def intersect_all(calendars: List["WeeklyAvailability"]) -> "WeeklyAvailability":
+        return WeeklyAvailability(np.logical_and.reduce([c.slots for c in calendars]))
+
+    @staticmethod
+    def union_all(calendars: List["WeeklyAvailability"]) -> "WeeklyAvailability":
+        if not calendars:
+            return WeeklyAvailability()
+        return WeeklyAvailability(np.logical_or.reduce([c.slots for c in calendars]))
+
+    def __and__(self, other: "WeeklyAvailability") -> "WeeklyAvailability":
+        return WeeklyAvailability(self.slots & other.slots)
+
+    def __or__(self, other: "WeeklyAvailability") -> "WeeklyAvailability":
+        return WeeklyAvailability(self.slots | other.slots)
+
+    def __sub__(self, other: "WeeklyAvailability") -> "WeeklyAvailability":
+        return WeeklyAvailability(self.slots & ~other.slots)
+
+    def minutes(self) -> int:
+        return int(self.slots.sum())
+
+    def covers(self, start: int, end: int) -> bool:
+        """Whether the half-open interval [start, end) is fully available."""
+        return 0 <= start < end <= WEEK_MINUTES and bool(self.slots[start:end].all())
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        """Available time as sorted half-open intervals."""
+        edges = np.diff(self.slots.astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def to_domain(self) -> cp_model.Domain:
+        """Domain of the available minutes."""
+        return cp_model.Domain.FromIntervals([[s, e - 1] for s, e in self.intervals()])
+
+    def start_mask(self, duration: int, step: int = 1) -> np.ndarray:
+        """Starts where [start, start + duration) is fully available, on a step grid counted from midnight."""
+        if duration <= 0:
+            ok = self.slots.copy()
+        else:
+            available = np.concatenate(([0], np.cumsum(self.slots, dtype=np.int32)))
+            ok = np.zeros(WEEK_MINUTES, dtype=bool)
+            last = WEEK_MINUTES - duration
+            if last >= 0:
+                ok[:last + 1] = available[duration:] - available[:-duration] == duration
+        if step > 1:
+            ok &= np.arange(WEEK_MINUTES) % 1440 % step == 0
+        return ok
+
+    def start_domain(self, duration: int, step: int = 1) -> cp_model.Domain:
+        ok = self.start_mask(duration, step)
+        if step > 1:
+            return cp_model.Domain.FromValues(np.flatnonzero(ok).tolist())
+        return WeeklyAvailability(ok).to_domain()
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the timetable solver. Run them as modules from the repository root:
+
+    python -m benchmarks                  # Scaling benchmark over the standard size tiers
+    python -m benchmarks.step_domains     # step_minutes start domains, before/after
+    python -m benchmarks.symmetry         # Session symmetry breaking, before/after
+    python -m benchmarks.db_concurrency   # Page reads during a schedule write, rollback journal vs WAL
+"""
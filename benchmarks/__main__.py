@@ -0,0 +1,46 @@
+"""
+Scaling benchmark of TimetableSolver over the standard size tiers.
+
+    python -m benchmarks --tiers xs s m --seeds 3 --time-limit 30 --json run.json --csv run.csv
+    python -m benchmarks --tiers xs s m --compare run.json
+"""
+import argparse
+
+from benchmarks.runner import run_benchmark, write_json, write_csv, read_json, compare
+from benchmarks.tiers import TIERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tiers", nargs="+", default=["xs", "s", "m"], choices=list(TIERS))
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--csv", help="Write results to this CSV file")
+    parser.add_argument("--compare", help="Baseline JSON file of an earlier run")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'tier':>4} {'seed':>4} {'sessions':>8} {'vars':>7} {'init s':>7} {'model s':>7} {'solve s':>7} {'extract s':>9} {'status':>9} {'obj':>6} {'bound':>6}")
+    for tier in args.tiers:
+        for seed in range(args.seeds):
+            r = run_benchmark(tier, TIERS[tier], seed, args.time_limit)
+            results.append(r)
+            print(f"{r.tier:>4} {r.seed:>4} {r.sessions:>8} {r.variables:>7} {r.init_seconds:>7.3f} {r.model_seconds:>7.3f} "
+                  f"{r.solve_seconds:>7.2f} {r.extract_seconds:>9.3f} {r.status:>9} {r.objective:>6.0f} {r.bound:>6.0f}")
+
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    if args.compare:
+        print(f"\nRelative to {args.compare} (> 1 is slower)")
+        print(f"{'tier':>4} {'seed':>4} {'init':>6} {'model':>6} {'solve':>6} {'extract':>7} {'obj diff':>8}")
+        for row in compare(read_json(args.compare), results):
+            ratios = [f"{row[s]:>{w}.2f}" if row[s] is not None else f"{'-':>{w}}" for s, w in [("init", 6), ("model", 6), ("solve", 6), ("extract", 7)]]
+            print(f"{row['tier']:>4} {row['seed']:>4} {' '.join(ratios)} {row['objective']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark of page-style reads while a solve writes a Schedule, rollback journal vs WAL.
+
+Reader threads repeat what a page rerun does: read the planning tables and one group's latest timetable.
+A writer process, like a solve worker, inserts schedules with their events and holds each write
+transaction open. Each journal mode runs against a fresh database file.
+
+    python -m benchmarks.db_concurrency [--readers 8] [--seconds 5] [--events 20000]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from dataclasses import replace
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, select
+
+from db_config import DBConfig, make_engine
+from models import Activity, Group, Instructor, Schedule, ScheduledEventRecord, Venue
+
+
+def seed(engine, activities: int = 500):
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(Group), [dict(name=f"Group {g}", gender="M", age_group=12) for g in range(1, 21)])
+        session.execute(insert(Instructor), [dict(name=f"Instructor {i}") for i in range(1, 21)])
+        session.execute(insert(Venue), [dict(name=f"Venue {v}") for v in range(1, 11)])
+        session.execute(insert(Activity), [dict(description=f"Activity {a}", duration_minutes=60, num_sessions=2,
+                                                step_minutes=15, group_id=1 + a % 20) for a in range(activities)])
+        session.commit()
+
+
+def write_schedules(config: DBConfig, events: int, hold: float, stop, written):
+    engine = make_engine(config)
+    while not stop.is_set():
+        with Session(engine) as session:
+            schedule = Schedule(stats="{}")
+            session.add(schedule)
+            session.flush()
+            session.execute(insert(ScheduledEventRecord), [dict(
+                schedule_id=schedule.id, title=f"Event {e}", days_of_week=1 + e % 5, start_time="09:00", end_time="10:00",
+                activity_id=1 + e % 500, group_id=1 + e % 20, instructor_id=1 + e % 20, venue_id=1 + e % 10,
+            ) for e in range(events)])
+            time.sleep(hold)  # A worker holds the transaction while it writes the rest of the result
+            session.commit()
+        with written.get_lock():
+            written.value += 1
+    engine.dispose()
+
+
+def read_pages(engine, stop: threading.Event, latencies: list, errors: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with Session(engine) as session:
+                for model in (Group, Instructor, Venue, Activity):
+                    session.exec(select(model)).all()
+                latest = session.exec(select(Schedule.id).order_by(Schedule.created.desc())).first()
+                if latest is not None:
+                    session.exec(select(ScheduledEventRecord).where(
+                        ScheduledEventRecord.schedule_id == latest, ScheduledEventRecord.group_id == 1)).all()
+        except Exception as e:  # e.g. "database is locked" once busy_timeout ran out
+            errors.append(type(e).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+def run(config: DBConfig, readers: int, seconds: float, events: int, hold: float) -> dict:
+    engine = make_engine(config)
+    seed(engine)
+    context = multiprocessing.get_context("spawn")
+    stop, writer_stop = threading.Event(), context.Event()
+    latencies, errors, written = [], [], context.Value("i", 0)
+    writer = context.Process(target=write_schedules, args=(config, events, hold, writer_stop, written))
+    threads = [threading.Thread(target=read_pages, args=(engine, stop, latencies, errors)) for _ in range(readers)]
+    writer.start()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    writer_stop.set()
+    for t in threads:
+        t.join()
+    writer.join()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "reads/s": len(latencies) / seconds,
+        "p50 ms": 1000 * statistics.median(latencies) if latencies else float("nan"),
+        "p95 ms": 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan"),
+        "max ms": 1000 * latencies[-1] if latencies else float("nan"),
+        "errors": len(errors),
+        "writes": written.value,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--events", type=int, default=20000, help="Events per written schedule")
+    parser.add_argument("--hold", type=float, default=0.2, help="Seconds each write transaction stays open")
+    args = parser.parse_args()
+
+    print(f"{'journal':>8} | {'reads/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>8} {'errors':>6} {'writes':>6}")
+    for journal_mode in ("DELETE", "WAL"):
+        with tempfile.TemporaryDirectory() as directory:
+            config = replace(DBConfig.from_env(), url=f"sqlite:///{os.path.join(directory, 'bench.sqlite')}",
+                             journal_mode=journal_mode, echo=False)
+            r = run(config, args.readers, args.seconds, args.events, args.hold)
+        print(f"{journal_mode:>8} | {r['reads/s']:>8.0f} {r['p50 ms']:>7.1f} {r['p95 ms']:>7.1f} {r['max ms']:>8.1f} "
+              f"{r['errors']:>6} {r['writes']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Seeded generator of synthetic planning instances, no database needed.
+"""
+import random
+from dataclasses import dataclass
+from datetime import time
+
+from models import Group, Instructor, Venue, Activity, DayPlanningTimePeriod, Day, Restriction, ActivityRestriction, Priority, TagLink
+from opt import Instance
+
+DAYS = [Day.MON, Day.TUE, Day.WED, Day.THU, Day.FRI, Day.SAT, Day.SUN]
+
+
+@dataclass
+class GeneratorConfig:
+    num_groups: int = 5
+    num_instructors: int = 4
+    num_venues: int = 3
+    num_activities: int = 20
+    min_sessions: int = 1
+    max_sessions: int = 3
+    num_days: int = 5  # Opening windows on the first num_days days of the week
+    num_tag_families: int = 0  # Split venues/instructors into tagged families, every activity requires one family
+
+
+def generate_instance(config: GeneratorConfig = None, seed: int = 0) -> Instance:
+    """Opening windows between 08:00 and 21:00, activity durations of 30-120 minutes."""
+    config = config or GeneratorConfig()
+    rng = random.Random(seed)
+
+    opening_times = []
+    for i, day in enumerate(DAYS[:config.num_days]):
+        opening_times.append(DayPlanningTimePeriod(
+            id=i + 1,
+            day=day,
+            opening_time=time(rng.randint(8, 10), rng.choice([0, 30])),
+            closing_time=time(rng.randint(17, 20), rng.choice([0, 30])),
+        ))
+
+    groups = [Group(id=g, name=f"Group {g}", gender=rng.choice(["M", "F", "MIXED"]), age_group=rng.randint(8, 18))
+              for g in range(1, config.num_groups + 1)]
+    instructors = [Instructor(id=i, name=f"Instructor {i}") for i in range(1, config.num_instructors + 1)]
+    venues = [Venue(id=v, name=f"Venue {v}") for v in range(1, config.num_venues + 1)]
+    activities = [Activity(
+        id=a,
+        description=f"Activity {a}",
+        duration_minutes=rng.choice([30, 45, 60, 90, 120]),
+        num_sessions=rng.randint(config.min_sessions, config.max_sessions),
+        step_minutes=rng.choice([5, 10, 15, 30, 60]),
+        group_id=rng.randint(1, config.num_groups),
+    ) for a in range(1, config.num_activities + 1)]
+
+    tag_links, restrictions = [], []
+    if config.num_tag_families:
+        # Tag ids 1..num_tag_families, resources are spread round robin over the families
+        tag_links += [TagLink(tag_id=1 + v.id % config.num_tag_families, entity_id=v.id, entity_type="venue") for v in venues]
+        tag_links += [TagLink(tag_id=1 + i.id % config.num_tag_families, entity_id=i.id, entity_type="instructor") for i in instructors]
+        for activity in activities:
+            tag_id = rng.randint(1, config.num_tag_families)
+            restriction = Restriction(id=activity.id, priority=Priority.MANDATORY)
+            restriction.set_restriction(ActivityRestriction(activity_id=activity.id, tag={"venue": tag_id, "instructor": tag_id}))
+            restrictions.append(restriction)
+
+    return Instance(groups=groups, instructors=instructors, venues=venues, activities=activities, opening_times=opening_times,
+                    tag_links=tag_links, restrictions=restrictions)
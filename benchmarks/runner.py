@@ -0,0 +1,87 @@
+"""
+Time the stages of a solve: __init__, model construction, solve and result extraction.
+"""
+import csv
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import List
+
+from benchmarks.generator import GeneratorConfig, generate_instance
+from opt import TimetableSolver
+
+
+@dataclass
+class BenchmarkResult:
+    tier: str
+    seed: int
+    sessions: int
+    variables: int
+    constraints: int
+    init_seconds: float
+    model_seconds: float
+    solve_seconds: float
+    extract_seconds: float
+    status: str
+    objective: float
+    bound: float
+
+
+def run_benchmark(tier: str, config: GeneratorConfig, seed: int, time_limit: float) -> BenchmarkResult:
+    instance = generate_instance(config, seed=seed)
+
+    started = time.perf_counter()
+    solver = TimetableSolver(instance)
+    init_seconds = time.perf_counter() - started
+
+    solver.build(time_limit=time_limit, log_search_progress=False)
+    proto = solver.model.proto
+    return BenchmarkResult(
+        tier=tier,
+        seed=seed,
+        sessions=len(solver.A),
+        variables=len(proto.variables),
+        constraints=len(proto.constraints),
+        init_seconds=init_seconds,
+        model_seconds=solver.timings["model"],
+        solve_seconds=solver.timings["solve"],
+        extract_seconds=solver.timings["extract"],
+        status=solver.solver.status_name(),
+        objective=solver.solver.objective_value,
+        bound=solver.solver.best_objective_bound,
+    )
+
+
+def write_json(results: List[BenchmarkResult], path: str):
+    with open(path, "w") as f:
+        json.dump([asdict(r) for r in results], f, indent=2)
+
+
+def write_csv(results: List[BenchmarkResult], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(BenchmarkResult.__dataclass_fields__))
+        writer.writeheader()
+        writer.writerows(asdict(r) for r in results)
+
+
+def read_json(path: str) -> List[BenchmarkResult]:
+    with open(path) as f:
+        return [BenchmarkResult(**r) for r in json.load(f)]
+
+
+def compare(baseline: List[BenchmarkResult], results: List[BenchmarkResult]) -> List[dict]:
+    """Stage timings of results relative to a baseline run of the same tiers and seeds, > 1 is slower."""
+    previous = {(r.tier, r.seed): r for r in baseline}
+    rows = []
+    for r in results:
+        b = previous.get((r.tier, r.seed))
+        if b is None:
+            continue
+        row = {"tier": r.tier, "seed": r.seed}
+        for stage in ["init", "model", "solve", "extract"]:
+            before = getattr(b, f"{stage}_seconds")
+            after = getattr(r, f"{stage}_seconds")
+            row[stage] = after / before if before else None
+        row["objective"] = r.objective - b.objective
+        rows.append(row)
+    return rows
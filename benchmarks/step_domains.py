@@ -0,0 +1,52 @@
+"""
+Before/after benchmark of step_minutes start domains.
+
+    python -m benchmarks.step_domains [--seeds 5] [--time-limit 30]
+"""
+import argparse
+import time
+
+from benchmarks.generator import GeneratorConfig, generate_instance
+from opt import TimetableSolver
+
+SIZES = [
+    dict(num_groups=4, num_instructors=3, num_venues=3, num_activities=12),
+    dict(num_groups=8, num_instructors=6, num_venues=5, num_activities=30),
+    dict(num_groups=12, num_instructors=10, num_venues=8, num_activities=60),
+]
+
+
+def run(size: dict, seed: int, snap_to_step: bool, time_limit: float) -> dict:
+    solver = TimetableSolver(generate_instance(GeneratorConfig(**size), seed=seed), snap_to_step=snap_to_step)
+    started = time.perf_counter()
+    solver.build(time_limit=time_limit, log_search_progress=False)
+    return {
+        "domain_size": sum(_domain_size(solver.starts[a].proto.domain) for a in solver.A),
+        "seconds": time.perf_counter() - started,
+        "status": solver.solver.status_name(),
+        "objective": solver.solver.objective_value,
+    }
+
+
+def _domain_size(domain) -> int:
+    return sum(domain[i + 1] - domain[i] + 1 for i in range(0, len(domain), 2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--time-limit", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"{'activities':>10} {'seed':>4} | {'before: values':>14} {'s':>7} {'status':>9} {'obj':>5} | {'after: values':>13} {'s':>7} {'status':>9} {'obj':>5}")
+    for size in SIZES:
+        for seed in range(args.seeds):
+            before = run(size, seed, snap_to_step=False, time_limit=args.time_limit)
+            after = run(size, seed, snap_to_step=True, time_limit=args.time_limit)
+            print(f"{size['num_activities']:>10} {seed:>4} | "
+                  f"{before['domain_size']:>14} {before['seconds']:>7.2f} {before['status']:>9} {before['objective']:>5.0f} | "
+                  f"{after['domain_size']:>13} {after['seconds']:>7.2f} {after['status']:>9} {after['objective']:>5.0f}")
+
+
+if __name__ == "__main__":
+    main()
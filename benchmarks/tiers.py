@@ -0,0 +1,12 @@
+"""
+Standard instance sizes, from a small club to a multi-site sports centre.
+"""
+from benchmarks.generator import GeneratorConfig
+
+TIERS = {
+    "xs": GeneratorConfig(num_groups=3, num_instructors=2, num_venues=2, num_activities=8),
+    "s": GeneratorConfig(num_groups=6, num_instructors=5, num_venues=4, num_activities=25),
+    "m": GeneratorConfig(num_groups=15, num_instructors=12, num_venues=8, num_activities=60, num_tag_families=2),
+    "l": GeneratorConfig(num_groups=30, num_instructors=30, num_venues=20, num_activities=150, num_days=6, num_tag_families=4),
+    "xl": GeneratorConfig(num_groups=60, num_instructors=60, num_venues=40, num_activities=300, num_days=7, num_tag_families=6),
+}
@@ -0,0 +1,193 @@
+"""
+Headless planning without the Streamlit app.
+
+    python cli.py export client.json.gz [--with-schedule]
+    python cli.py solve snapshots/*.json.gz --profile Overnight --workers 4 --out results --report report.csv [--save]
+
+export writes the planning data of the database to an instance snapshot, see snapshot. solve solves
+snapshot files in a process pool, one file per worker, and writes <name>.schedule.json per file to --out
+plus one timing report row per file. <name> is the file name without .json/.gz, files with the same
+name get -2, -3, ... appended in the order given. --save also stores every timetable as a Schedule in the database.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlmodel import select
+
+from compact import as_compact
+from db import DEFAULT_SOLVER_PROFILES, create_db, get_session
+from decompose import solve_decomposed, split_instance
+from models import SolverProfile
+from opt import SOLVED_STATUSES
+from snapshot import read_snapshot, write_snapshot
+
+REPORT_COLUMNS = ["file", "status", "sessions", "events", "parts", "objective", "bound", "gap",
+                  "load_seconds", "solve_seconds", "wall_seconds", "schedule_file", "schedule_id", "error"]
+
+
+def find_profile(name: Optional[str]) -> Optional[dict]:
+    """Fields of the named profile, from the database or else the built-in defaults. None keeps the CP-SAT defaults."""
+    if name is None:
+        return None
+    with get_session() as session:
+        profile = session.exec(select(SolverProfile).where(SolverProfile.name == name)).first()
+    if profile is not None:
+        return profile.model_dump(exclude={"id"})
+    for profile in DEFAULT_SOLVER_PROFILES:
+        if profile["name"] == name:
+            return dict(profile)
+    raise SystemExit(f"Unknown solver profile {name!r}")
+
+
+def export(args):
+    from jobs import load_instance
+    from schedules import latest_events
+
+    create_db()
+    instance = load_instance(cached=False)
+    previous = latest_events() if args.with_schedule else None
+    write_snapshot(args.out, instance, previous)
+    print(f"Wrote {args.out}: {len(instance.activities)} activities, {len(previous or [])} previous events")
+
+
+def schedule_files(paths: List[str], out: str) -> Dict[str, str]:
+    """Result file per snapshot path, unique even when files in different directories share a name."""
+    files, taken = {}, set()
+    for path in dict.fromkeys(paths):  # A file given twice is written once
+        name = Path(path).name
+        for suffix in (".gz", ".json"):
+            name = name.removesuffix(suffix)
+        candidate, n = name, 1
+        while candidate in taken:
+            n += 1
+            candidate = f"{name}-{n}"
+        taken.add(candidate)
+        files[path] = os.path.join(out, f"{candidate}.schedule.json")
+    return files
+
+
+def solve_file(path: str, profile: Optional[dict], time_limit: Optional[float], part_workers: int, schedule_file: Optional[str]) -> dict:
+    """Worker entry point: solve one snapshot, writes its events to schedule_file, returns its report row and events."""
+    row = dict(file=path)
+    started = time.perf_counter()
+    try:
+        instance, previous = read_snapshot(path)
+        instance = as_compact(instance)
+        row["load_seconds"] = time.perf_counter() - started
+        row["sessions"] = instance.session_count
+
+        solved = time.perf_counter()
+        parts = split_instance(instance)
+        events, proto, stats = solve_decomposed(
+            instance, max_workers=part_workers, parts=parts,
+            solver_options=dict(previous=previous),
+            build_options=dict(profile=SolverProfile(**profile) if profile else None, time_limit=time_limit,
+                               log_search_progress=False),
+        )
+        stats["profile"] = profile["name"] if profile else None
+        row["solve_seconds"] = time.perf_counter() - solved
+        row.update(status=stats["status"], events=len(events), parts=len(parts),
+                   objective=stats["objective"], bound=stats["bound"], gap=stats["gap"])
+
+        if schedule_file:
+            row["schedule_file"] = schedule_file
+            with open(schedule_file, "w", encoding="utf-8") as f:
+                json.dump({"source": path, "stats": stats, "events": [e.to_dict() for e in events]}, f)
+        result = dict(row=row, events=events, proto=proto, stats=stats)
+    except Exception:
+        row.update(status="FAILED", error=traceback.format_exc(limit=3))
+        result = dict(row=row, events=None)
+    row["wall_seconds"] = time.perf_counter() - started
+    return result
+
+
+def save(result: dict) -> int:
+    from schedules import save_schedule
+
+    with get_session() as session:
+        schedule = save_schedule(session, result["events"], result["proto"], result["stats"])
+        session.commit()
+        return schedule.id
+
+
+def write_report(rows, path: str):
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def solve(args):
+    create_db()
+    profile = find_profile(args.profile)
+    outputs = {}
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        outputs = schedule_files(args.files, args.out)
+    # One file per worker, a single file may use the workers for its independent parts instead
+    workers = max(1, min(args.workers, len(args.files)))
+    part_workers = args.workers if len(args.files) == 1 else 1
+
+    rows = []
+    print(f"{'file':<32} {'status':>9} {'sessions':>8} {'events':>6} {'obj':>8} {'bound':>8} {'solve s':>8} {'wall s':>7}")
+    # spawn: workers do not inherit the parent's open connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(solve_file, path, profile, args.time_limit, part_workers, outputs.get(path)) for path in args.files]
+        for future in as_completed(futures):
+            result = future.result()
+            row = result["row"]
+            # Saved from this process only, so SQLite sees a single writer
+            if args.save and result["events"] and row["status"] in SOLVED_STATUSES:
+                row["schedule_id"] = save(result)
+            rows.append(row)
+            print(f"{os.path.basename(row['file']):<32} {row['status']:>9} {row.get('sessions', 0):>8} {row.get('events', 0):>6} "
+                  f"{row.get('objective', float('nan')):>8.0f} {row.get('bound', float('nan')):>8.0f} "
+                  f"{row.get('solve_seconds', 0):>8.2f} {row['wall_seconds']:>7.2f}")
+            if row.get("error"):
+                print(row["error"], file=sys.stderr)
+
+    rows.sort(key=lambda r: args.files.index(r["file"]))
+    if args.report:
+        write_report(rows, args.report)
+    return 1 if any(r["status"] == "FAILED" for r in rows) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Write the planning data of the database to a snapshot file")
+    export_parser.add_argument("out", help="Snapshot file, gzip compressed when it ends in .gz")
+    export_parser.add_argument("--with-schedule", action="store_true", help="Include the latest timetable as warm start")
+
+    solve_parser = commands.add_parser("solve", help="Solve snapshot files in a process pool")
+    solve_parser.add_argument("files", nargs="+")
+    solve_parser.add_argument("--profile", help="Solver profile name, from the database or a built-in default")
+    solve_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Files solved at the same time")
+    solve_parser.add_argument("--time-limit", type=float, help="Seconds per file, overrides the profile's limit")
+    solve_parser.add_argument("--out", help="Directory for the <name>.schedule.json results")
+    solve_parser.add_argument("--report", help="Timing report, JSON when it ends in .json, CSV otherwise")
+    solve_parser.add_argument("--save", action="store_true", help="Store each timetable as a Schedule in the database")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args)
+    else:
+        sys.exit(solve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Compact, array-backed planning instance for the solver.
+
+Groups, venues, instructors and activities are numbered 0..n-1 in id order and the fields that shape
+the CP-SAT model are held in numpy arrays. Sessions are numbered activity after activity, so session
+s belongs to activity session_activity[s]. Eligibility is stored per activity as index ranges into
+flat arrays (CSR). The instance pickles to a few arrays instead of ORM objects, hashes by content,
+and the model-building loops iterate integers instead of string keys.
+"""
+import hashlib
+import json
+from itertools import chain
+from typing import List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+from eligibility import build_eligibility
+from models import expand_day
+from opening_hours import OpeningHours, compile_opening_hours, window_minutes
+from restrictions import CompiledRule, RestrictionIndex
+
+
+class ActivityRow(NamedTuple):
+    """The fields of an Activity the solver reads, duck-typed for RestrictionIndex and the solver's per-activity methods."""
+    id: int
+    group_id: int
+    duration_minutes: int
+    num_sessions: int
+    step_minutes: int
+    description: str
+
+
+class Link(NamedTuple):
+    tag_id: int
+    entity_id: int
+    entity_type: str
+
+
+def _ids(rows) -> np.ndarray:
+    return np.array(sorted(r.id for r in rows), dtype=np.int64)
+
+
+def _csr(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(pointers, values): the values of list k are values[pointers[k]:pointers[k + 1]]."""
+    pointers = np.zeros(len(lists) + 1, dtype=np.int64)
+    pointers[1:] = np.cumsum([len(values) for values in lists])
+    values = np.array(list(chain.from_iterable(lists)), dtype=np.int64)
+    return pointers, values
+
+
+class CompactInstance:
+    __slots__ = (
+        "group_ids", "venue_ids", "instructor_ids",  # Index -> id
+        "activity_ids", "activity_group", "durations", "num_sessions", "steps", "titles",  # Per activity, activity_group is a group index
+        "session_offsets", "session_activity",  # First session of each activity, and the activity of each session
+        "venue_ptr", "venue_index", "instructor_ptr", "instructor_index",  # Eligible resource indices per activity
+        "opening", "unavailability", "rules", "tag_links",
+        "_fingerprint",
+    )
+
+    def __init__(self, group_ids, venue_ids, instructor_ids, activity_ids, activity_group, durations, num_sessions, steps,
+                 titles, venue_ptr, venue_index, instructor_ptr, instructor_index, opening: OpeningHours,
+                 unavailability: Tuple[Tuple[str, int, int, int], ...], rules: Tuple[CompiledRule, ...], tag_links: Tuple[Link, ...]):
+        """Arrays in index order, see from_instance. unavailability holds (entity_type, entity_id, from_minute, to_minute) of the week."""
+        self.group_ids = group_ids
+        self.venue_ids = venue_ids
+        self.instructor_ids = instructor_ids
+        self.activity_ids = activity_ids
+        self.activity_group = activity_group
+        self.durations = durations
+        self.num_sessions = num_sessions
+        self.steps = steps
+        self.titles = titles
+        self.session_offsets = np.cumsum(num_sessions, dtype=np.int64) - num_sessions
+        self.session_activity = np.repeat(np.arange(len(activity_ids), dtype=np.int64), num_sessions)
+        self.venue_ptr = venue_ptr
+        self.venue_index = venue_index
+        self.instructor_ptr = instructor_ptr
+        self.instructor_index = instructor_index
+        self.opening = opening
+        self.unavailability = unavailability
+        self.rules = rules
+        self.tag_links = tag_links
+        self._fingerprint = None
+
+    @classmethod
+    def from_instance(cls, instance) -> "CompactInstance":
+        """Read an Instance of SQLModel objects once, the solver then never touches them."""
+        rules = tuple(CompiledRule(id=r.id, rule=r.get_restriction(), priority=r.priority) for r in instance.restrictions)
+        tag_links = tuple(Link(t.tag_id, t.entity_id, t.entity_type) for t in instance.tag_links)
+        restrictions = RestrictionIndex(rules, tag_links)
+        eligibility = build_eligibility(instance, restrictions)
+
+        activities = sorted(instance.activities, key=lambda a: a.id)
+        # Groups of activities whose group row is missing still get an index, their sessions must not overlap either
+        group_ids = np.union1d(_ids(instance.groups), np.array([a.group_id for a in activities], dtype=np.int64))
+        venue_ids = _ids(instance.venues)
+        instructor_ids = _ids(instance.instructors)
+
+        unavailability = tuple(sorted(
+            (u.entity_type, u.entity_id, d * 1440 + start, d * 1440 + end)
+            for u in instance.unavailability
+            for start, end in [window_minutes(u.start_time, u.end_time)]
+            for d in expand_day(u.day)
+        ))
+        venue_position = {id: v for v, id in enumerate(venue_ids.tolist())}
+        instructor_position = {id: i for i, id in enumerate(instructor_ids.tolist())}
+        venue_ptr, venue_index = _csr([[venue_position[v] for v in eligibility.venues[a.id]] for a in activities])
+        instructor_ptr, instructor_index = _csr([[instructor_position[i] for i in eligibility.instructors[a.id]] for a in activities])
+        return cls(
+            group_ids=group_ids,
+            venue_ids=venue_ids,
+            instructor_ids=instructor_ids,
+            activity_ids=np.array([a.id for a in activities], dtype=np.int64),
+            activity_group=np.searchsorted(group_ids, [a.group_id for a in activities]).astype(np.int64),
+            durations=np.array([a.duration_minutes for a in activities], dtype=np.int64),
+            num_sessions=np.array([a.num_sessions for a in activities], dtype=np.int64),
+            steps=np.array([a.step_minutes for a in activities], dtype=np.int64),
+            titles=tuple(a.description for a in activities),
+            venue_ptr=venue_ptr,
+            venue_index=venue_index,
+            instructor_ptr=instructor_ptr,
+            instructor_index=instructor_index,
+            opening=compile_opening_hours(instance.opening_times),
+            unavailability=unavailability,
+            rules=rules,
+            tag_links=tag_links,
+        )
+
+    @property
+    def session_count(self) -> int:
+        return len(self.session_activity)
+
+    def activity(self, k: int) -> ActivityRow:
+        return ActivityRow(int(self.activity_ids[k]), int(self.group_ids[self.activity_group[k]]), int(self.durations[k]),
+                           int(self.num_sessions[k]), int(self.steps[k]), self.titles[k])
+
+    def activity_rows(self) -> List[ActivityRow]:
+        group_ids = self.group_ids[self.activity_group].tolist()
+        return [ActivityRow(*fields) for fields in zip(self.activity_ids.tolist(), group_ids, self.durations.tolist(),
+                                                        self.num_sessions.tolist(), self.steps.tolist(), self.titles)]
+
+    def sessions(self, k: int) -> range:
+        start = int(self.session_offsets[k])
+        return range(start, start + int(self.num_sessions[k]))
+
+    def eligible_venues(self, k: int) -> np.ndarray:
+        """Venue indices activity k may use."""
+        return self.venue_index[self.venue_ptr[k]:self.venue_ptr[k + 1]]
+
+    def eligible_instructors(self, k: int) -> np.ndarray:
+        return self.instructor_index[self.instructor_ptr[k]:self.instructor_ptr[k + 1]]
+
+    def subset(self, activities: Sequence[int]) -> "CompactInstance":
+        """
+        The instance of the given activity indices, with only the groups, venues and instructors they use.
+        Opening hours, unavailability, rules and tag links are shared.
+        """
+        activities = np.sort(np.asarray(activities, dtype=np.int64))
+        venue_lists = [self.eligible_venues(k) for k in activities.tolist()]
+        instructor_lists = [self.eligible_instructors(k) for k in activities.tolist()]
+        groups = np.unique(self.activity_group[activities])
+        venues = np.unique(np.concatenate(venue_lists)) if venue_lists else np.array([], dtype=np.int64)
+        instructors = np.unique(np.concatenate(instructor_lists)) if instructor_lists else np.array([], dtype=np.int64)
+        # Old index -> new index is the position in the kept, sorted indices
+        venue_ptr, venue_index = _csr([np.searchsorted(venues, v).tolist() for v in venue_lists])
+        instructor_ptr, instructor_index = _csr([np.searchsorted(instructors, i).tolist() for i in instructor_lists])
+        return CompactInstance(
+            group_ids=self.group_ids[groups],
+            venue_ids=self.venue_ids[venues],
+            instructor_ids=self.instructor_ids[instructors],
+            activity_ids=self.activity_ids[activities],
+            activity_group=np.searchsorted(groups, self.activity_group[activities]).astype(np.int64),
+            durations=self.durations[activities],
+            num_sessions=self.num_sessions[activities],
+            steps=self.steps[activities],
+            titles=tuple(self.titles[k] for k in activities.tolist()),
+            venue_ptr=venue_ptr,
+            venue_index=venue_index,
+            instructor_ptr=instructor_ptr,
+            instructor_index=instructor_index,
+            opening=self.opening,
+            unavailability=self.unavailability,
+            rules=self.rules,
+            tag_links=self.tag_links,
+        )
+
+    def fingerprint(self) -> str:
+        """Content hash of everything that shapes the model, titles excluded. Computed once."""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for array in (self.group_ids, self.venue_ids, self.instructor_ids, self.activity_ids, self.activity_group,
+                          self.durations, self.num_sessions, self.steps, self.venue_ptr, self.venue_index,
+                          self.instructor_ptr, self.instructor_index):
+                digest.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+                digest.update(b"|")  # Arrays of different lengths never hash alike
+            digest.update(json.dumps([
+                self.opening.intervals,
+                self.unavailability,
+                sorted(self.tag_links),
+                sorted((r.rule.model_dump_json(), r.priority.value) for r in self.rules),
+            ]).encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint())
+
+    def __eq__(self, other):
+        return isinstance(other, CompactInstance) and self.fingerprint() == other.fingerprint()
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+def as_compact(instance: Union["CompactInstance", object]) -> CompactInstance:
+    """The compact form of an Instance, a CompactInstance is returned as is."""
+    return instance if isinstance(instance, CompactInstance) else CompactInstance.from_instance(instance)
@@ -0,0 +1,110 @@
+"""
+Overlap checks on a timetable without the solver.
+
+Events are indexed per group, venue and instructor in start-sorted timelines. A full validation
+sweeps each timeline once, O(n log n) plus the conflicts found. Checking one moved event bisects
+the timelines of its resources, O(log n): only events starting less than the resource's longest
+event before the new end can overlap it.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from models import ScheduledEvent, day_index_time_to_minutes, time_to_minutes
+from opening_hours import OpeningHours
+
+RESOURCES = ("group", "venue", "instructor")
+
+
+@dataclass
+class Conflict:
+    kind: str  # group, venue, instructor, or opening when an event runs outside the opening hours
+    resource_id: Optional[int]
+    event: int  # Index into the checked events
+    other: Optional[int]  # The overlapping event, None for opening
+    start: int  # Overlap in minutes of the week
+    end: int
+
+
+def event_interval(event: ScheduledEvent) -> Tuple[int, int]:
+    """(start, end) in minutes of the week, an end at or before the start runs past midnight."""
+    start = day_index_time_to_minutes(event.days_of_week, event.start_time)
+    duration = (time_to_minutes(event.end_time) - time_to_minutes(event.start_time)) % 1440
+    return start, start + duration
+
+
+class Timeline:
+    """Intervals of one resource sorted by start."""
+    __slots__ = ("starts", "ends", "events", "longest")
+
+    def __init__(self, intervals: List[Tuple[int, int, int]]):
+        intervals.sort()
+        self.starts = [s for s, _, _ in intervals]
+        self.ends = [e for _, e, _ in intervals]
+        self.events = [i for _, _, i in intervals]
+        self.longest = max((e - s for s, e, _ in intervals), default=0)
+
+    def overlapping(self, start: int, end: int) -> List[Tuple[int, int, int]]:
+        """(event, overlap start, overlap end) of the intervals overlapping [start, end)."""
+        low = bisect_right(self.starts, start - self.longest)
+        high = bisect_left(self.starts, end)
+        return [(self.events[k], max(start, self.starts[k]), min(end, self.ends[k]))
+                for k in range(low, high) if self.ends[k] > start]
+
+
+class ConflictIndex:
+
+    def __init__(self, events: List[ScheduledEvent], opening: Optional[OpeningHours] = None):
+        """opening: also report events outside the opening hours."""
+        self.events = list(events)
+        self.intervals = [event_interval(e) for e in self.events]
+        self.opening = opening
+        by_resource = defaultdict(list)
+        for i, (event, (start, end)) in enumerate(zip(self.events, self.intervals)):
+            for kind in RESOURCES:
+                id = getattr(event, f"{kind}_id")
+                if id is not None:
+                    by_resource[(kind, id)].append((start, end, i))
+        self.timelines: Dict[Tuple[str, int], Timeline] = {key: Timeline(items) for key, items in by_resource.items()}
+
+    def validate(self) -> List[Conflict]:
+        """Every overlapping pair once, plus events outside the opening hours."""
+        conflicts = []
+        for (kind, id), timeline in self.timelines.items():
+            # Sweep: compare each interval with the open ones still running at its start
+            running = []  # Heap of (end, event) of the intervals that have not ended
+            for start, end, event in zip(timeline.starts, timeline.ends, timeline.events):
+                while running and running[0][0] <= start:
+                    heapq.heappop(running)
+                for other_end, other in running:
+                    conflicts.append(Conflict(kind, id, other, event, start, min(end, other_end)))
+                heapq.heappush(running, (end, event))
+        for i, (start, end) in enumerate(self.intervals):
+            conflicts += self._closed(i, start, end)
+        return conflicts
+
+    def check_move(self, i: int, start: int) -> List[Conflict]:
+        """Conflicts event i would have if it started at minute start of the week, the others staying put."""
+        duration = self.intervals[i][1] - self.intervals[i][0]
+        end = start + duration
+        event = self.events[i]
+        conflicts = []
+        for kind in RESOURCES:
+            id = getattr(event, f"{kind}_id")
+            timeline = self.timelines.get((kind, id))
+            if timeline is None:
+                continue
+            conflicts += [Conflict(kind, id, i, other, s, e) for other, s, e in timeline.overlapping(start, end) if other != i]
+        return conflicts + self._closed(i, start, end)
+
+    def _closed(self, i: int, start: int, end: int) -> List[Conflict]:
+        if self.opening is None:
+            return []
+        # Inside the opening hours when one opening interval covers the whole event
+        intervals = self.opening.intervals
+        k = bisect_right(intervals, (start, float("inf"))) - 1
+        if k >= 0 and intervals[k][0] <= start and end <= intervals[k][1]:
+            return []
+        return [Conflict("opening", None, i, None, start, end)]
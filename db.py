@@ -1,25 +1,30 @@
-from sqlmodel import Field, SQLModel, create_engine, Session, select
-from models import metadata, Instructor, Group, Activity, Venue
+from sqlmodel import Field, SQLModel, Session, select
+from models import metadata, Instructor, Group, Activity, Venue, SolverProfile
 import pandas as pd 
-from sqlalchemy import event
+from db_config import DBConfig, make_engine
+from sqlalchemy import event, update, delete, inspect, text
+from cachetools import LRUCache
+from collections import defaultdict
+from typing import List, Optional
+from enum import Enum
+from sqlalchemy.sql import sqltypes
+import threading
 
 
-sqlite_file_name = "/tmp/db.sqlite"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+db_config = DBConfig.from_env()
+engine = make_engine(db_config)  # WAL, pragmas and pool size, see db_config
 
-engine = create_engine(sqlite_url, echo=True, connect_args={"check_same_thread": False})
-
-
-# Ensure foreign key enforcement
-@event.listens_for(engine, "connect")
-def enforce_foreign_keys(dbapi_connection, connection_record):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON;")
-    cursor.close()
+# Interactive preview, batch run using every core, and a reproducible run
+DEFAULT_SOLVER_PROFILES = [
+    dict(name="Quick preview", max_time_in_seconds=10, num_workers=8),
+    dict(name="Overnight", max_time_in_seconds=8 * 3600, num_workers=0),
+    dict(name="Deterministic", max_deterministic_time=60, num_workers=8, random_seed=42, interleave_search=True),
+]
 
 
 def create_db():
     SQLModel.metadata.create_all(engine)
+    migrate_db()
     # Check and insert default records if tables are empty
     with Session(engine) as session:
         # Check if 'Instructor' table is empty
@@ -43,20 +48,149 @@ def create_db():
             session.add(default_group)
             session.commit()
 
+        # Check if 'SolverProfile' table is empty
+        if not session.execute(select(SolverProfile)).scalars().first():
+            session.add_all([SolverProfile(**profile) for profile in DEFAULT_SOLVER_PROFILES])
+            session.commit()
+
+def migrate_db():
+    """
+    Bring tables created by an older version up to date. create_all only creates missing tables, so
+    columns and indexes added to a model since are added here. Safe to run on every start.
+    """
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    connection.execute(text(_add_column_sql(table, column, connection.dialect)))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+
+
+def _add_column_sql(table, column, dialect) -> str:
+    # Rows already in the table get the column's default, or NULL. Added columns stay nullable,
+    # SQLite cannot add a NOT NULL column without a constant default.
+    preparer = dialect.identifier_preparer
+    sql = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = default.arg.name if isinstance(default.arg, Enum) else default.arg  # Enum columns store the member name
+        render = column.type.literal_processor(dialect) or sqltypes.String().literal_processor(dialect)
+        sql += f" DEFAULT {render(value)}"
+    return sql
+
+
 # 🚀 Get Database Session
 def get_session():
     return Session(engine)
 
+# Read cache
+# ----------
+# Every table has a version counter, bumped when a transaction that wrote to it commits. Cached reads
+# are keyed by that version, so a rerun that changed nothing is served without touching SQLite.
+# Counters live in this process: processes that do not see the writers' commits (solve workers) read uncached.
+
+READ_CACHE_SIZE = 128
+_table_versions = defaultdict(int)
+_read_cache = LRUCache(maxsize=READ_CACHE_SIZE)
+_cache_lock = threading.Lock()
+
+
+def _mark_written(session, tables):
+    session.info.setdefault("written_tables", set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session, flush_context):
+    _mark_written(session, {obj.__table__.name for obj in [*session.new, *session.dirty, *session.deleted]
+                            if hasattr(obj, "__table__")})
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_statements(orm_execute_state):
+    # Bulk insert/update/delete statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _mark_written(orm_execute_state.session, {mapper.local_table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session):
+    tables = session.info.pop("written_tables", set())
+    if tables:
+        with _cache_lock:
+            for table in tables:
+                _table_versions[table] += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written(session):
+    session.info.pop("written_tables", None)
+
+
+def table_version(model) -> int:
+    return _table_versions[model.__tablename__]
+
+
+def _cached_read(kind, model, read):
+    key = (kind, model.__tablename__, table_version(model))
+    with _cache_lock:
+        if key in _read_cache:
+            return _read_cache[key]
+    value = read()
+    with _cache_lock:
+        _read_cache[key] = value
+    return value
+
+
 # 🚀 Helper Function: Get DataFrame from SQLModel
-def fetch_data(model):
-    with get_session() as session:
-        results = session.exec(select(model)).all()
-        return pd.DataFrame([row.dict() for row in results])
+def fetch_data(model, cached: bool = True):
+    """All rows of a table as a DataFrame, a copy the caller may modify."""
+    def read():
+        with get_session() as session:
+            results = session.exec(select(model)).all()
+            return pd.DataFrame([row.model_dump() for row in results])
+    return (_cached_read("frame", model, read) if cached else read()).copy()
+
+def fetch_objs(model, cached: bool = True):
+    """All rows of a table as detached objects. Cached objects are shared between callers, do not modify them."""
+    def read():
+        with get_session() as session:
+            return session.exec(select(model)).all()
+    return list(_cached_read("objs", model, read) if cached else read())
+
+def save_edits(model, original: pd.DataFrame, edited: pd.DataFrame, columns: List[str], delete_column: Optional[str] = None) -> dict:
+    """
+    Persist a st.data_editor table in one transaction: rows whose columns differ from original are
+    updated with one executemany, rows ticked in delete_column are deleted with one statement.
+    Rows are matched on id. Nothing is written when a statement fails, e.g. a delete blocked by references.
+    """
+    if edited.empty:
+        return {"updated": 0, "deleted": 0}
+    after = edited.set_index("id")
+    to_delete = after.index[after[delete_column].astype(bool)].tolist() if delete_column else []
+
+    changed = []
+    if columns and not after.empty:
+        after = after.loc[~after.index.isin(to_delete), columns]
+        before = original.set_index("id")[columns].reindex(after.index)
+        differs = (before != after) & ~(before.isna() & after.isna())
+        rows = after[differs.any(axis=1)].reset_index().astype(object)
+        changed = rows.where(rows.notna(), None).to_dict("records")  # Python scalars, NaN -> NULL
 
-def fetch_objs(model):
     with get_session() as session:
-        results = session.exec(select(model)).all()
-        return results
+        if changed:
+            session.execute(update(model), changed)  # Bulk UPDATE by primary key
+        if to_delete:
+            session.execute(delete(model).where(model.id.in_(to_delete)))
+        session.commit()
+    return {"updated": len(changed), "deleted": len(to_delete)}
 
 
 # Initialize database
@@ -0,0 +1,76 @@
+"""
+Database configuration from the environment.
+
+SQLite runs in WAL mode by default, so the Streamlit readers and a solve worker writing a Schedule
+do not block each other, with the synchronous/cache/mmap pragmas set on every new connection.
+"""
+import os
+from dataclasses import dataclass
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class DBConfig:
+    url: str
+    echo: bool = False
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"  # Safe with WAL, a commit does not wait for the checkpoint fsync
+    cache_size_kib: int = 64 * 1024
+    mmap_size: int = 256 * 1024 * 1024
+    busy_timeout_ms: int = 5000  # Wait for a lock instead of failing with "database is locked"
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_timeout: float = 30.0
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.url.startswith("sqlite")
+
+    @classmethod
+    def from_env(cls) -> "DBConfig":
+        """DATABASE_URL wins over DB_PATH, the default is /tmp/db.sqlite."""
+        url = os.environ.get("DATABASE_URL") or f"sqlite:///{os.environ.get('DB_PATH', '/tmp/db.sqlite')}"
+        return cls(
+            url=url,
+            echo=_env_bool("SQL_ECHO", False),
+            journal_mode=os.environ.get("SQLITE_JOURNAL_MODE", cls.journal_mode),
+            synchronous=os.environ.get("SQLITE_SYNCHRONOUS", cls.synchronous),
+            cache_size_kib=int(os.environ.get("SQLITE_CACHE_SIZE_KIB", cls.cache_size_kib)),
+            mmap_size=int(os.environ.get("SQLITE_MMAP_SIZE", cls.mmap_size)),
+            busy_timeout_ms=int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", cls.busy_timeout_ms)),
+            pool_size=int(os.environ.get("DB_POOL_SIZE", cls.pool_size)),
+            max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", cls.max_overflow)),
+            pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", cls.pool_timeout)),
+        )
+
+
+def make_engine(config: DBConfig) -> Engine:
+    options = dict(echo=config.echo, pool_pre_ping=True)
+    if config.is_sqlite:
+        # In-memory databases live in a single connection, keep SQLAlchemy's default pool for them
+        if ":memory:" not in config.url and config.url != "sqlite://":
+            options.update(pool_size=config.pool_size, max_overflow=config.max_overflow, pool_timeout=config.pool_timeout)
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(pool_size=config.pool_size, max_overflow=config.max_overflow, pool_timeout=config.pool_timeout)
+    engine = create_engine(config.url, **options)
+
+    if config.is_sqlite:
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON;")
+            cursor.execute(f"PRAGMA journal_mode={config.journal_mode};")
+            cursor.execute(f"PRAGMA synchronous={config.synchronous};")
+            cursor.execute(f"PRAGMA cache_size=-{config.cache_size_kib};")  # Negative: KiB instead of pages
+            cursor.execute(f"PRAGMA mmap_size={config.mmap_size};")
+            cursor.execute(f"PRAGMA busy_timeout={config.busy_timeout_ms};")
+            cursor.close()
+
+    return engine
@@ -0,0 +1,211 @@
+"""
+Split an instance into independent sub-problems and solve them in parallel.
+
+Two activities interact only through a shared group or a shared venue/instructor candidate.
+The connected components of that conflict graph (separate sites, disjoint eligibility sets)
+are solved as separate CP-SAT models in a process pool and merged into one timetable.
+DecomposedSolve runs the parts in threads instead, so incumbents can be streamed and the
+run stopped like a single TimetableSolver. Either way the parts that run at the same time
+split the profile's search workers, and all parts share one time limit.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import defaultdict
+from typing import Callable, List, Optional, Tuple, Union
+
+from compact import CompactInstance, as_compact
+from models import ScheduledEvent, SolverProfile
+from opt import SOLVED_STATUSES, Instance, TimetableSolver
+
+
+DECOMPOSE_WORKERS = int(os.environ.get("DECOMPOSE_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_SESSIONS = 200  # Smaller instances solve faster than a process pool starts
+
+
+class DisjointSet:
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]  # Path halving
+            x = self.parent[x]
+        return x
+
+    def union(self, x, y):
+        root_x, root_y = self.find(x), self.find(y)
+        if root_x != root_y:
+            self.parent[root_y] = root_x
+
+
+def split_instance(instance: Union[Instance, CompactInstance]) -> List[CompactInstance]:
+    """Independent sub-instances, one per connected component, largest first."""
+    compact = as_compact(instance)
+    num_activities, num_groups, num_venues = len(compact.activity_ids), len(compact.group_ids), len(compact.venue_ids)
+
+    # Nodes are integers: activities, then groups, venues and instructors, each by index
+    components = DisjointSet()
+    for k, group in enumerate(compact.activity_group.tolist()):
+        components.union(k, num_activities + group)
+        for v in compact.eligible_venues(k).tolist():
+            components.union(k, num_activities + num_groups + v)
+        for i in compact.eligible_instructors(k).tolist():
+            components.union(k, num_activities + num_groups + num_venues + i)
+
+    # Bucket the activities by the root of their component, resources no activity can use are left out
+    parts = defaultdict(list)
+    for k in range(num_activities):
+        parts[components.find(k)].append(k)
+
+    sub_instances = [compact.subset(activities) for activities in parts.values()]
+    sub_instances.sort(key=lambda part: part.session_count, reverse=True)
+    return sub_instances
+
+
+def solve_decomposed(instance: Union[Instance, CompactInstance], max_workers: int = DECOMPOSE_WORKERS, solver_options: dict = None,
+                     build_options: dict = None, parts: List[CompactInstance] = None) -> Tuple[List[ScheduledEvent], Optional[bytes], dict]:
+    """
+    Solve every component on its own and merge the events and solver statistics.
+
+    solver_options go to TimetableSolver, build_options to build(), parts can be passed when split_instance
+    already ran. The proto is only returned when the instance does not split, there is no single model otherwise.
+    """
+    solver_options = solver_options or {}
+    build_options = build_options or {}
+
+    parts = parts if parts is not None else split_instance(instance)
+    if len(parts) <= 1:
+        return _solve_part(instance, solver_options, build_options)
+
+    deadline = _deadline(build_options)
+    sessions = sum(part.session_count for part in parts)
+    if max_workers <= 1 or sessions < PARALLEL_MIN_SESSIONS:
+        results = [_solve_part(part, solver_options, build_options, deadline=deadline, rounds_left=len(parts) - p)
+                   for p, part in enumerate(parts)]
+    else:
+        concurrent = min(max_workers, len(parts))
+        # spawn: do not fork the caller's threads and open connections into the workers
+        with ProcessPoolExecutor(max_workers=concurrent, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_solve_part, parts, [solver_options] * len(parts), [build_options] * len(parts),
+                                    [concurrent] * len(parts), [deadline] * len(parts),
+                                    [_rounds_left(p, len(parts), concurrent) for p in range(len(parts))]))
+
+    scheduled_events = [e for events, _, _ in results for e in events]
+    return scheduled_events, None, merge_stats([stats for _, _, stats in results])
+
+
+def merge_stats(stats: List[dict]) -> dict:
+    """Combine the statistics of the parts as if they were one run."""
+    objective = sum(s["objective"] for s in stats)
+    bound = sum(s["bound"] for s in stats)
+    statuses = [s["status"] for s in stats]
+    unsolved = [status for status in statuses if status not in SOLVED_STATUSES]
+    return {
+        # The merged timetable is only complete when every part found one, and only optimal when every part is
+        "status": unsolved[0] if unsolved else "OPTIMAL" if set(statuses) == {"OPTIMAL"} else "FEASIBLE",
+        "wall_time": max(s["wall_time"] for s in stats),
+        "branches": sum(s["branches"] for s in stats),
+        "conflicts": sum(s["conflicts"] for s in stats),
+        "objective": objective,
+        "bound": bound,
+        "gap": abs(bound - objective) / max(1.0, abs(objective)),
+        "parts": len(stats),
+    }
+
+
+def _deadline(build_options: dict) -> Optional[float]:
+    """time.time() by which every part must be done: the time_limit, or else the profile's wall time limit."""
+    limit = build_options.get("time_limit")
+    profile = build_options.get("profile")
+    if limit is None and profile is not None:
+        limit = profile.max_time_in_seconds
+    return time.time() + limit if limit is not None else None
+
+
+def _part_build_options(build_options: dict, concurrent: int = 1, deadline: Optional[float] = None, rounds_left: int = 1) -> dict:
+    """
+    build() options of one part: the profile's search workers (0 or unset is every core) split across the
+    concurrent parts, and its share of the time left until the shared deadline. Parts start in rounds of
+    concurrent parts, each round still to come gets an equal share, time a round leaves unused goes to the next.
+    """
+    options = dict(build_options)
+    if concurrent > 1:
+        profile = options.get("profile")
+        cores = os.cpu_count() or 1
+        workers = max(1, ((profile.num_workers if profile is not None else None) or cores) // concurrent)
+        if profile is not None:
+            options["profile"] = profile.model_copy(update={"num_workers": workers})
+        else:
+            options["profile"] = SolverProfile(name="part", num_workers=workers, log_search_progress=options.pop("log_search_progress", True))
+    if deadline is not None:
+        options["time_limit"] = max(0.0, deadline - time.time()) / rounds_left
+    return options
+
+
+def _rounds_left(p: int, num_parts: int, concurrent: int) -> int:
+    """Rounds still to run when part p starts, its own included, parts start in order."""
+    return -(-num_parts // concurrent) - p // concurrent
+
+
+def _solve_part(instance: Union[Instance, CompactInstance], solver_options: dict, build_options: dict,
+                concurrent: int = 1, deadline: Optional[float] = None, rounds_left: int = 1):
+    solver = TimetableSolver(instance, **solver_options)
+    events, proto = solver.build(**_part_build_options(build_options, concurrent, deadline, rounds_left))
+    return events, proto, solver.stats()
+
+
+class DecomposedSolve:
+    """
+    Solve the parts of a split instance in threads of this process, with the build(), stats() and stop()
+    of a TimetableSolver. CP-SAT releases the GIL while it searches, so parts run in parallel.
+    """
+
+    def __init__(self, parts: List[CompactInstance], solver_options: dict = None, max_workers: int = DECOMPOSE_WORKERS):
+        self.solvers = [TimetableSolver(part, **(solver_options or {})) for part in parts]
+        self.max_workers = max(1, min(max_workers, len(parts)))
+        self.stopped = False
+        self._lock = threading.Lock()
+        self._incumbents = [None] * len(parts)  # Latest (events, objective, bound) of each part
+
+    def build(self, on_solution: Optional[Callable[[List[ScheduledEvent], float, float, float], None]] = None, **build_options):
+        """Like TimetableSolver.build, on_solution gets the merged incumbent whenever a part improves. No proto is returned."""
+        started = time.perf_counter()
+        deadline = _deadline(build_options)
+
+        def solve(p: int):
+            options = _part_build_options(build_options, self.max_workers, deadline, _rounds_left(p, len(self.solvers), self.max_workers))
+            if self.stopped:
+                options["time_limit"] = 0  # Stopped before this part started, it keeps no solution
+            callback = (lambda *incumbent: self._improved(p, started, on_solution, *incumbent)) if on_solution else None
+            events, _ = self.solvers[p].build(on_solution=callback, **options)
+            return events
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(solve, range(len(self.solvers))))
+        return [e for events in results for e in events], None
+
+    def _improved(self, p: int, started: float, on_solution, events, objective: float, bound: float, wall_time: float):
+        # Callbacks come from the parts' search threads, hand on one merged timetable at a time
+        with self._lock:
+            self._incumbents[p] = (events, objective, bound)
+            found = [incumbent for incumbent in self._incumbents if incumbent is not None]
+            on_solution(
+                [e for events, _, _ in found for e in events],
+                sum(objective for _, objective, _ in found),
+                sum(bound for _, _, bound in found),  # Of the parts with a solution
+                time.perf_counter() - started,
+            )
+
+    def stats(self) -> dict:
+        return merge_stats([solver.stats() for solver in self.solvers])
+
+    def stop(self):
+        """Stop every part, build() then returns the best solutions found so far."""
+        self.stopped = True
+        for solver in self.solvers:
+            solver.stop()
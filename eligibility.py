@@ -0,0 +1,54 @@
+"""
+Which venues and instructors may be assigned to each activity.
+
+Derived from mandatory restrictions: a pinned ``venue_id``/``instructor_id``, or a required ``tag``
+({"venue": tag_id, "instructor": tag_id}) resolved through TagLink. Activities without such
+restrictions may use every venue and instructor.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from restrictions import RestrictionIndex
+
+
+@dataclass
+class Eligibility:
+    venues: Dict[int, List[int]]  # Activity id -> eligible venue ids
+    instructors: Dict[int, List[int]]  # Activity id -> eligible instructor ids
+
+    def pairs(self) -> int:
+        """Number of (activity, resource) pairs that need a variable."""
+        return sum(len(v) for v in self.venues.values()) + sum(len(i) for i in self.instructors.values())
+
+
+def build_eligibility(instance, restrictions: Optional[RestrictionIndex] = None) -> Eligibility:
+    """restrictions can be passed when the instance's restrictions are already compiled."""
+    if restrictions is None:
+        restrictions = RestrictionIndex(instance.restrictions, instance.tag_links)
+
+    venue_ids = [v.id for v in instance.venues]
+    instructor_ids = [i.id for i in instance.instructors]
+
+    venues, instructors = {}, {}
+    for activity in instance.activities:
+        allowed_venues = set(venue_ids)
+        allowed_instructors = set(instructor_ids)
+        # Only mandatory rules restrict eligibility, the others are preferences
+        for compiled in restrictions.rules_for(activity):
+            if not compiled.mandatory:
+                continue
+            rule = compiled.rule
+            if rule.venue_id is not None:
+                allowed_venues &= {rule.venue_id}
+            if rule.instructor_id is not None:
+                allowed_instructors &= {rule.instructor_id}
+            for entity_type, tag_id in (rule.tag or {}).items():
+                if entity_type == "venue":
+                    allowed_venues &= restrictions.tagged[("venue", tag_id)]
+                elif entity_type == "instructor":
+                    allowed_instructors &= restrictions.tagged[("instructor", tag_id)]
+        # Keep the instance order so variable creation is deterministic
+        venues[activity.id] = [v for v in venue_ids if v in allowed_venues]
+        instructors[activity.id] = [i for i in instructor_ids if i in allowed_instructors]
+
+    return Eligibility(venues=venues, instructors=instructors)
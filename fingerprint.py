@@ -0,0 +1,13 @@
+"""
+Content hash of a planning instance.
+
+Only the fields that shape the CP-SAT model are hashed: renaming a group or an activity
+does not change the fingerprint, changing a duration or an opening time does. The hash is
+taken over the arrays of the compact instance, see CompactInstance.fingerprint.
+"""
+from compact import as_compact
+
+
+def instance_fingerprint(instance) -> str:
+    """instance: an Instance or a CompactInstance."""
+    return as_compact(instance).fingerprint()
@@ -0,0 +1,207 @@
+"""
+Bulk import of groups, instructors, venues and activities from CSV, Parquet or Excel files.
+
+Files are read in chunks, each chunk is validated with column operations against the model
+constraints and its valid rows are inserted with one executemany. All chunks share one
+transaction, invalid rows are skipped and reported with their row number (1 = first data row).
+Excel files are read with openpyxl, imported only when one is uploaded.
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy import insert
+from sqlmodel import select
+
+from db import get_session
+from models import Activity, Group, Instructor, Venue
+
+
+IMPORT_CHUNK_ROWS = 10_000
+MAX_REPORTED_ERRORS = 1_000  # Errors past this are counted, not listed
+GENDERS = ["M", "F", "MIXED"]
+
+
+@dataclass
+class RowError:
+    row: int
+    message: str
+
+
+@dataclass
+class ImportReport:
+    kind: str
+    rows: int = 0
+    inserted: int = 0
+    error_count: int = 0
+    errors: List[RowError] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error_count == 0
+
+
+@dataclass
+class ImportSpec:
+    model: type
+    columns: List[str]  # Required columns of the file
+    validate: Callable[[pd.DataFrame, pd.Series, dict], pd.DataFrame]  # (chunk, problems, context) -> insert rows
+
+
+# Vectorized checks: append a message to problems for every row the mask selects
+# ------------------------------------------------------------------------------
+
+def _flag(problems: pd.Series, bad: pd.Series, message: str):
+    bad = bad.fillna(False).astype(bool)
+    problems.loc[bad] = problems.loc[bad] + message + "; "
+
+
+def _text(chunk: pd.DataFrame, problems: pd.Series, column: str) -> pd.Series:
+    values = chunk[column].astype("string").str.strip()
+    _flag(problems, values.isna() | values.eq(""), f"{column} is empty")
+    return values
+
+
+def _integer(chunk: pd.DataFrame, problems: pd.Series, column: str, low: int = None, high: int = None) -> pd.Series:
+    values = pd.to_numeric(chunk[column], errors="coerce")
+    bad = values.isna() | (values % 1 != 0)
+    if low is not None:
+        bad |= values < low
+    if high is not None:
+        bad |= values > high
+    bounds = f" between {low} and {high}" if low is not None and high is not None else f" of at least {low}" if low is not None else ""
+    _flag(problems, bad, f"{column} must be a whole number{bounds}")
+    return values
+
+
+def _named(chunk, problems, context):
+    return pd.DataFrame({"name": _text(chunk, problems, "name")})
+
+
+def _groups(chunk, problems, context):
+    gender = _text(chunk, problems, "gender").str.upper()
+    _flag(problems, gender.notna() & ~gender.isin(GENDERS), f"gender must be one of {', '.join(GENDERS)}")
+    return pd.DataFrame({
+        "name": _text(chunk, problems, "name"),
+        "gender": gender,
+        "age_group": _integer(chunk, problems, "age_group", 0, 100),
+    })
+
+
+def _activities(chunk, problems, context):
+    group = _text(chunk, problems, "group")
+    group_id = group.map(context["group_ids"])
+    _flag(problems, group.notna() & group.isin(context["ambiguous_groups"]), "group name is not unique")
+    _flag(problems, group.notna() & group.ne("") & group_id.isna() & ~group.isin(context["ambiguous_groups"]), "unknown group")
+    return pd.DataFrame({
+        "description": _text(chunk, problems, "description"),
+        "duration_minutes": _integer(chunk, problems, "duration_minutes", 1),
+        "num_sessions": _integer(chunk, problems, "num_sessions", 1),
+        "step_minutes": _integer(chunk, problems, "step_minutes", 5, 60),
+        "group_id": group_id,
+    })
+
+
+SPECS: Dict[str, ImportSpec] = {
+    "groups": ImportSpec(Group, ["name", "gender", "age_group"], _groups),
+    "instructors": ImportSpec(Instructor, ["name"], _named),
+    "venues": ImportSpec(Venue, ["name"], _named),
+    "activities": ImportSpec(Activity, ["description", "duration_minutes", "num_sessions", "step_minutes", "group"], _activities),
+}
+
+
+# Chunked readers
+# ---------------
+
+def read_chunks(source, file_name: Optional[str] = None, chunk_rows: int = IMPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    DataFrames of at most chunk_rows rows. source is a path or a binary file object (e.g. a Streamlit upload),
+    the format follows the extension of file_name, or of source when it is a path.
+    """
+    extension = os.path.splitext(file_name or str(source))[1].lower()
+    if extension in (".csv", ".txt"):
+        yield from pd.read_csv(source, chunksize=chunk_rows, dtype=str, keep_default_na=False, na_values=[""])
+    elif extension in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif extension in (".xlsx", ".xlsm"):
+        yield from _excel_chunks(source, chunk_rows)
+    else:
+        raise ValueError(f"Unsupported file type {extension or '(none)'}, use CSV, Parquet or Excel (.xlsx)")
+
+
+def _excel_chunks(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Excel import needs openpyxl: pip install openpyxl") from None
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)  # Streams rows instead of loading the sheet
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, [])]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+# Import
+# ------
+
+def import_file(kind: str, source, file_name: Optional[str] = None, chunk_rows: int = IMPORT_CHUNK_ROWS,
+                dry_run: bool = False) -> ImportReport:
+    """
+    Validate and insert every row of a file as kind (groups, instructors, venues or activities).
+    Valid rows are committed together at the end, dry_run only validates. Raises ValueError when
+    the file lacks a required column.
+    """
+    spec = SPECS[kind]
+    report = ImportReport(kind=kind)
+    started = time.perf_counter()
+
+    with get_session() as session:
+        context = {}
+        if kind == "activities":
+            groups = pd.DataFrame(session.exec(select(Group.id, Group.name)).all(), columns=["id", "name"])
+            counts = groups["name"].value_counts()
+            context["ambiguous_groups"] = counts.index[counts > 1].tolist()
+            unique = groups[~groups["name"].isin(context["ambiguous_groups"])]
+            context["group_ids"] = dict(zip(unique["name"], unique["id"]))
+
+        for chunk in read_chunks(source, file_name, chunk_rows):
+            chunk.columns = [str(c).strip().lower().replace(" ", "_") for c in chunk.columns]
+            missing = [c for c in spec.columns if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"Missing column(s): {', '.join(missing)}")
+            chunk.index = pd.RangeIndex(report.rows + 1, report.rows + 1 + len(chunk))  # Row numbers for the report
+            report.rows += len(chunk)
+
+            problems = pd.Series("", index=chunk.index, dtype=object)
+            rows = spec.validate(chunk, problems, context)
+            invalid = problems.ne("")
+            report.error_count += int(invalid.sum())
+            room = MAX_REPORTED_ERRORS - len(report.errors)
+            if room > 0:
+                report.errors += [RowError(row, message.rstrip("; ")) for row, message in problems[invalid].head(room).items()]
+
+            valid = rows[~invalid]
+            valid = valid.astype({c: "int64" for c in valid.select_dtypes("number").columns}).astype(object)
+            if not valid.empty and not dry_run:
+                # Python ints and strings for the driver, one executemany per chunk
+                session.execute(insert(spec.model), valid.to_dict("records"))
+            report.inserted += len(valid)
+
+        if not dry_run:
+            session.commit()
+    report.seconds = time.perf_counter() - started
+    return report
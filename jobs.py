@@ -0,0 +1,296 @@
+"""
+Background solve jobs.
+
+Auto-Plan requests are stored in the ``solve_job`` table and executed in a process pool,
+so the Streamlit script thread never blocks on CP-SAT and a rerun does not cancel a solve.
+The pool size caps how many solves run at once, further jobs wait in the queue.
+When a worker process dies the pool breaks: its jobs are marked failed and the next job starts a new pool.
+The latest improving solution of a running job is kept in ``solve_incumbent``, written at most once per
+poll and deleted once the job finishes.
+"""
+import json
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict
+from datetime import datetime
+
+from sqlmodel import delete, select
+
+from db import fetch_objs, get_session
+from models import Group, Instructor, Venue, Activity, DayPlanningTimePeriod, TagLink, Restriction, Unavailability, SolveJob, SolveIncumbent, SolverProfile, JobStatus
+from compact import as_compact
+from opt import SOLVED_STATUSES, Instance, Neighbourhood, TimetableSolver
+from decompose import DECOMPOSE_WORKERS, DecomposedSolve, split_instance
+from schedules import latest_events, save_schedule
+
+
+MAX_CONCURRENT_SOLVES = int(os.environ.get("MAX_CONCURRENT_SOLVES", 2))
+# Parts of a split instance one job solves at a time: the cores are shared by the concurrent jobs
+PARTS_PER_JOB = max(1, min(DECOMPOSE_WORKERS, (os.cpu_count() or 1) // MAX_CONCURRENT_SOLVES))
+STOP_POLL_SECONDS = 1.0
+
+_executor = None
+_executor_lock = threading.Lock()
+_orphans_failed = False
+_orphans_lock = threading.Lock()
+
+
+def recover_orphaned_jobs():
+    """
+    Fail the jobs a previous server process left queued/running, they will never finish. Runs once per
+    process: the pages that show job state call it on load, so stale jobs and incumbents are cleared on
+    restart, not only once the next job is submitted. Solve workers must not call it.
+    """
+    global _orphans_failed
+    with _orphans_lock:
+        if not _orphans_failed:
+            fail_orphaned_jobs()
+            _orphans_failed = True
+
+
+def get_executor():
+    """Return the process wide solve pool, creating it on first use and after it broke."""
+    global _executor
+    recover_orphaned_jobs()  # Before the first job of this process is queued
+    with _executor_lock:
+        if _executor is None:
+            # spawn: do not fork the Streamlit server (threads, open connections) into the workers
+            _executor = ProcessPoolExecutor(
+                max_workers=MAX_CONCURRENT_SOLVES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """Forget a broken pool, the next get_executor() starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def load_instance(cached: bool = True) -> Instance:
+    """Snapshot the current planning data from the database. Worker processes read uncached, see db."""
+    return Instance(
+        groups=fetch_objs(Group, cached),
+        instructors=fetch_objs(Instructor, cached),
+        venues=fetch_objs(Venue, cached),
+        activities=fetch_objs(Activity, cached),
+        opening_times=fetch_objs(DayPlanningTimePeriod, cached),
+        tag_links=fetch_objs(TagLink, cached),
+        restrictions=fetch_objs(Restriction, cached),
+        unavailability=fetch_objs(Unavailability, cached),
+    )
+
+
+def get_profile(profile_id: int | None) -> SolverProfile | None:
+    if profile_id is None:
+        return None
+    with get_session() as session:
+        return session.get(SolverProfile, profile_id)
+
+
+def submit_solve_job(warm_start: bool = True, disruption_weight: int = 0, solver_profile_id: int | None = None,
+                     neighbourhood: Neighbourhood | None = None, time_limit: float | None = None) -> int:
+    """
+    Queue a new Auto-Plan run and return its job id. With a neighbourhood only that part of the
+    latest Schedule is re-planned, the rest stays as it is.
+    """
+    executor = get_executor()
+    with get_session() as session:
+        job = SolveJob(
+            warm_start=warm_start or neighbourhood is not None,
+            disruption_weight=disruption_weight,
+            solver_profile_id=solver_profile_id,
+            neighbourhood=json.dumps(asdict(neighbourhood)) if neighbourhood is not None else None,
+            time_limit=time_limit,
+        )
+        session.add(job)
+        session.commit()
+        job_id = job.id
+    try:
+        future = executor.submit(run_solve_job, job_id)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed when out of memory) and took the pool down, start a new one
+        _discard_executor(executor)
+        executor = get_executor()
+        future = executor.submit(run_solve_job, job_id)
+    future.add_done_callback(lambda f: _job_finished(job_id, executor, f))
+    return job_id
+
+
+def _job_finished(job_id: int, executor: ProcessPoolExecutor, future: Future):
+    # run_solve_job records its own errors, an exception here means the job never ran to the end
+    error = None if future.cancelled() else future.exception()
+    if error is None and not future.cancelled():
+        return
+    if isinstance(error, BrokenProcessPool):
+        _discard_executor(executor)
+        message = "The solve worker process died, e.g. it ran out of memory."
+    else:
+        message = "".join(traceback.format_exception(error)) if error is not None else "Cancelled."
+    with get_session() as session:
+        job = session.get(SolveJob, job_id)
+        if job is not None and job.status in (JobStatus.QUEUED, JobStatus.RUNNING):
+            job.status = JobStatus.FAILED
+            job.finished = datetime.utcnow()
+            job.error = message
+            session.exec(delete(SolveIncumbent).where(SolveIncumbent.job_id == job_id))
+            session.commit()
+
+
+def run_solve_job(job_id: int):
+    """Worker entry point: solve the current instance and store the resulting Schedule."""
+    job = _update_job(job_id, status=JobStatus.RUNNING, started=datetime.utcnow())
+    try:
+        instance = as_compact(load_instance(cached=False))  # Converted once, split_instance and the solver share it
+        solver_options = dict(
+            previous=latest_events() if job.warm_start else None,
+            disruption_weight=job.disruption_weight,
+            cache_models=True,
+            neighbourhood=Neighbourhood(**json.loads(job.neighbourhood)) if job.neighbourhood else None,
+        )
+        profile = get_profile(job.solver_profile_id)
+        build_options = dict(profile=profile, time_limit=job.time_limit)
+        parts = split_instance(instance)
+        if len(parts) > 1:
+            # Independent sites solve in parallel, and still stream incumbents and stop on request
+            solver = DecomposedSolve(parts, solver_options, max_workers=PARTS_PER_JOB)
+        else:
+            solver = TimetableSolver(instance=instance, **solver_options)
+        incumbents = IncumbentWriter(job_id)
+        finished = threading.Event()
+        watcher = threading.Thread(target=_watch_job, args=(job_id, solver, incumbents, finished), daemon=True)
+        watcher.start()
+        try:
+            # The callback only keeps a reference, the search does not wait for JSON and SQLite
+            scheduled_activities, proto = solver.build(on_solution=incumbents.offer, **build_options)
+        finally:
+            finished.set()
+            watcher.join()
+        stats = solver.stats()
+        stats["profile"] = profile.name if profile is not None else None
+        if stats["status"] not in SOLVED_STATUSES or not scheduled_activities:
+            # No timetable to keep: an empty Schedule would become the latest one and hide the last good one
+            _update_job(job_id, status=JobStatus.FAILED, finished=datetime.utcnow(),
+                        error=f"No timetable found, the solver ended with status {stats['status']}.")
+            delete_incumbents(job_id)
+            return
+        with get_session() as session:
+            schedule = save_schedule(session, scheduled_activities, proto, stats)
+            job = session.get(SolveJob, job_id)
+            job.status = JobStatus.DONE
+            job.schedule_id = schedule.id
+            job.finished = datetime.utcnow()
+            session.exec(delete(SolveIncumbent).where(SolveIncumbent.job_id == job_id))
+            session.commit()
+    except Exception:
+        _update_job(job_id, status=JobStatus.FAILED, finished=datetime.utcnow(), error=traceback.format_exc())
+        delete_incumbents(job_id)
+
+
+class IncumbentWriter:
+    """
+    Latest incumbent of a running job. offer() is the solution callback and only keeps the newest
+    solution, flush() writes it, replacing the job's previous row, when it changed since the last flush.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def offer(self, events, objective: float, bound: float, wall_time: float):
+        with self._lock:
+            self._pending = (events, objective, bound, wall_time)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            save_incumbent(self.job_id, *pending)
+
+
+def save_incumbent(job_id: int, events, objective: float, bound: float, wall_time: float):
+    """Store the incumbent as the job's only one."""
+    with get_session() as session:
+        session.exec(delete(SolveIncumbent).where(SolveIncumbent.job_id == job_id))
+        session.add(SolveIncumbent(
+            job_id=job_id,
+            objective=objective,
+            bound=bound,
+            wall_time=wall_time,
+            result=json.dumps({i: e.to_dict() for i, e in enumerate(events)})
+        ))
+        session.commit()
+
+
+def delete_incumbents(job_id: int):
+    with get_session() as session:
+        session.exec(delete(SolveIncumbent).where(SolveIncumbent.job_id == job_id))
+        session.commit()
+
+
+def request_stop(job_id: int):
+    """Ask a running job to stop and keep the best timetable found so far."""
+    _update_job(job_id, stop_requested=True)
+
+
+def latest_incumbent(job_id: int):
+    with get_session() as session:
+        return session.exec(
+            select(SolveIncumbent)
+            .where(SolveIncumbent.job_id == job_id)
+            .order_by(SolveIncumbent.id.desc())
+        ).first()
+
+
+def fetch_running_jobs():
+    with get_session() as session:
+        return session.exec(
+            select(SolveJob).where(SolveJob.status == JobStatus.RUNNING).order_by(SolveJob.created)
+        ).all()
+
+
+def fetch_jobs(limit: int = 20):
+    """Most recent jobs first."""
+    with get_session() as session:
+        return session.exec(select(SolveJob).order_by(SolveJob.created.desc()).limit(limit)).all()
+
+
+def fail_orphaned_jobs():
+    with get_session() as session:
+        jobs = session.exec(
+            select(SolveJob).where(SolveJob.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]))
+        ).all()
+        for job in jobs:
+            job.status = JobStatus.FAILED
+            job.finished = datetime.utcnow()
+            job.error = "Interrupted: the server was restarted before the job finished."
+        session.exec(delete(SolveIncumbent))  # Only running jobs have incumbents
+        session.commit()
+
+
+def _watch_job(job_id: int, solver: TimetableSolver | DecomposedSolve, incumbents: IncumbentWriter, finished: threading.Event):
+    # Once per poll: write the newest incumbent and check the stop flag, which lives in the database
+    while not finished.wait(STOP_POLL_SECONDS):
+        incumbents.flush()
+        with get_session() as session:
+            job = session.get(SolveJob, job_id)
+            if job is not None and job.stop_requested:
+                solver.stop()
+
+
+def _update_job(job_id: int, **values):
+    with get_session() as session:
+        job = session.get(SolveJob, job_id)
+        for key, value in values.items():
+            setattr(job, key, value)
+        session.commit()
+        session.refresh(job)
+        return job
@@ -0,0 +1,116 @@
+"""
+On-disk cache of built CP-SAT models.
+
+Entries are keyed by TimetableSolver.model_key() and hold the serialized CpModelProto plus the
+proto indices of the decision variables, so a cached model can be solved and read back without
+running the model construction. At most MODEL_CACHE_SIZE entries are kept, the least recently
+used ones are removed when a new entry is stored.
+
+The indices are stored as plain arrays (npz, read without pickle) in a directory only this user may
+write to, a cache directory another user can write to is not used at all.
+"""
+import io
+import os
+import stat
+import zipfile
+from typing import Optional, Tuple
+
+import numpy as np
+
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "timetabling", "models"))
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", 32))
+SUFFIXES = (".pb", ".index.npz")
+
+
+def _path(key: str, suffix: str) -> str:
+    return os.path.join(MODEL_CACHE_DIR, key + suffix)
+
+
+def _private_dir(create: bool = False) -> bool:
+    """Whether MODEL_CACHE_DIR is a directory owned by this user that nobody else can write to."""
+    if create:
+        os.makedirs(MODEL_CACHE_DIR, mode=0o700, exist_ok=True)
+    try:
+        info = os.stat(MODEL_CACHE_DIR)
+    except OSError:
+        return False
+    return stat.S_ISDIR(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _pack(index: dict) -> bytes:
+    # Tuples of arrays are flattened to "name.0", "name.1", ...
+    arrays = {}
+    for name, value in index.items():
+        if isinstance(value, tuple):
+            arrays.update({f"{name}.{n}": array for n, array in enumerate(value)})
+        else:
+            arrays[name] = value
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def _unpack(path: str) -> dict:
+    index, parts = {}, {}
+    with np.load(path, allow_pickle=False) as arrays:
+        for name in arrays.files:
+            base, _, n = name.partition(".")
+            if n:
+                parts.setdefault(base, {})[int(n)] = arrays[name]
+            else:
+                index[name] = arrays[name]
+    index.update({base: tuple(values[n] for n in sorted(values)) for base, values in parts.items()})
+    return index
+
+
+def load(key: str) -> Optional[Tuple[bytes, dict]]:
+    if not _private_dir():
+        return None
+    try:
+        with open(_path(key, ".pb"), "rb") as f:
+            proto = f.read()
+        index = _unpack(_path(key, ".index.npz"))
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    try:
+        os.utime(_path(key, ".pb"))  # The modification time orders the entries by last use
+    except OSError:
+        pass
+    return proto, index
+
+
+def store(key: str, proto: bytes, index: dict):
+    if not _private_dir(create=True):
+        return
+    # Write to a temporary file first, concurrent readers never see half an entry
+    for suffix, data in zip(SUFFIXES, [proto, _pack(index)]):
+        tmp = _path(key, suffix + f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, _path(key, suffix))
+    _evict()
+
+
+def _evict():
+    """Remove the least recently used entries beyond MODEL_CACHE_SIZE."""
+    entries = []
+    for name in os.listdir(MODEL_CACHE_DIR):
+        if name.endswith(".pb"):
+            try:
+                entries.append((os.path.getmtime(os.path.join(MODEL_CACHE_DIR, name)), name[:-len(".pb")]))
+            except OSError:
+                pass  # Removed by another process meanwhile
+    entries.sort(reverse=True)
+    for _, key in entries[MODEL_CACHE_SIZE:]:
+        for suffix in SUFFIXES:
+            try:
+                os.remove(_path(key, suffix))
+            except OSError:
+                pass
+
+
+def clear():
+    if not os.path.isdir(MODEL_CACHE_DIR):
+        return
+    for name in os.listdir(MODEL_CACHE_DIR):
+        os.remove(os.path.join(MODEL_CACHE_DIR, name))
@@ -3,7 +3,7 @@ from enum import Enum
 import json
 from sqlmodel import Field, Session, SQLModel, Relationship, MetaData, Column, ForeignKey
 from datetime import time, datetime, date, timedelta
-from sqlalchemy import JSON
+from sqlalchemy import JSON, Index
 from typing import List, Optional, Dict
 
 
@@ -20,6 +20,13 @@ class Priority(str, Enum):
     LOW = 'low'
 
 
+class JobStatus(str, Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
 class Day(str, Enum):
     MON = "mon"
     TUE = "tue"
@@ -134,24 +141,42 @@ class Activity(SQLModel, HashMixin, table=True):
     #     return values
 
 
+class Unavailability(SQLModel, table=True):
+    """
+    A weekly period a venue, instructor or group cannot be scheduled, e.g. an instructor's day off or venue maintenance.
+    """
+    __tablename__ = "unavailability"
+    __table_args__ = {"extend_existing": True}
+
+    id: int | None = Field(default=None, primary_key=True)
+    entity_type: str = Field(...)  # "venue", "instructor" or "group"
+    entity_id: int = Field(...)
+    day: Day = Field(...)
+    start_time: time
+    end_time: time
+    reason: Optional[str] = Field(default=None)
+
+
 # RESTRICTION & RULES
 # -------------------
 
 class ActivityRestriction(SQLModel):
     """
-    Only one can be set.
+    Only one rule can be set, activity_id, group_id and activity_tag_id select which activities it applies to.
     """
 
-    earliest_start: Dict[Day, time] = None  # Activity earliest starting time
-    latest_start: Dict[Day, time] = None  # Activity latest starting time
-    earliest_end: Dict[Day, time] = None  # Activity earliest end time
-    latest_end: Dict[Day, time] = None  # Activity latest end time
-    on_day: List[Day] = None  # Activity can be programed on this day according to the priority provided
-    not_on_day: List[Day] = None  # Avoid programming on this day according to the priority provided
-    tag: Dict[str, int] = None  # The Entity assigned should have this Tag. Use Priority accordingly
-    instructor_id: int = None  # The Instructor assigned should be this one. Use Priority accordingly
-    venue_id: int = None  # Activity Should be assigned on this venue. Use Priority accordingly
-    group_id: int = None  # Group Should be assigned this activity. Use Priority accordingly
+    earliest_start: Optional[Dict[Day, time]] = None  # Activity earliest starting time
+    latest_start: Optional[Dict[Day, time]] = None  # Activity latest starting time
+    earliest_end: Optional[Dict[Day, time]] = None  # Activity earliest end time
+    latest_end: Optional[Dict[Day, time]] = None  # Activity latest end time
+    on_day: Optional[List[Day]] = None  # Activity can be programed on this day according to the priority provided
+    not_on_day: Optional[List[Day]] = None  # Avoid programming on this day according to the priority provided
+    tag: Optional[Dict[str, int]] = None  # The Entity assigned should have this Tag. Use Priority accordingly
+    instructor_id: Optional[int] = None  # The Instructor assigned should be this one. Use Priority accordingly
+    venue_id: Optional[int] = None  # Activity Should be assigned on this venue. Use Priority accordingly
+    group_id: Optional[int] = None  # Applies to the activities of this Group
+    activity_tag_id: Optional[int] = None  # Applies to the activities carrying this Tag
+    activity_id: Optional[int] = None  # Applies to this Activity only. Without any selector it applies to all activities
 
 
 class Restriction(SQLModel, table=True):
@@ -164,7 +189,7 @@ class Restriction(SQLModel, table=True):
 
     def set_restriction(self, restriction: ActivityRestriction):
         """Store ActivityRestriction as a JSON string."""
-        self.restriction = json.dumps(restriction.model_dump())
+        self.restriction = json.dumps(restriction.model_dump(mode="json"))
 
     def get_restriction(self) -> ActivityRestriction:
         """Retrieve ActivityRestriction from JSON."""
@@ -194,13 +219,120 @@ class ScheduledEvent():
         }
 
 
+class SolverProfile(SQLModel, table=True):
+    """
+    Named CP-SAT parameter set. Unset (None) values keep the CP-SAT default.
+    """
+    __tablename__ = "solver_profile"
+    __table_args__ = {"extend_existing": True}
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str = Field(..., unique=True)
+    max_time_in_seconds: Optional[float] = Field(default=None, description="Wall time limit")
+    max_deterministic_time: Optional[float] = Field(default=None, description="Reproducible work limit, independent of machine load")
+    num_workers: Optional[int] = Field(default=None, description="Parallel search workers, 0 uses all cores")
+    random_seed: Optional[int] = Field(default=None)
+    relative_gap_limit: Optional[float] = Field(default=None, description="Stop once the objective is this close to the bound")
+    interleave_search: bool = Field(default=False, description="Deterministic interleaved portfolio instead of parallel threads")
+    log_search_progress: bool = Field(default=False)
+
+    def apply(self, parameters):
+        """Copy the profile onto a CpSolver's parameters."""
+        for name in ["max_time_in_seconds", "max_deterministic_time", "num_workers", "random_seed", "relative_gap_limit"]:
+            value = getattr(self, name)
+            if value is not None:
+                setattr(parameters, name, value)
+        parameters.interleave_search = self.interleave_search
+        parameters.log_search_progress = self.log_search_progress
+
+
 class Schedule(SQLModel, table=True):
+    """
+    A solved timetable. Read it through the schedules module, which leaves the large proto and
+    result columns unloaded until they are needed.
+    """
     __tablename__ = "schedule"
     __table_args__ = {"extend_existing": True}
 
     id: int | None = Field(default=None, primary_key=True)
-    proto: Optional[bytes] = Field(default=None, description="Serialized proto or metadata identifier")
-    result: str = Field(default=None, description="Optimization result as JSON")
+    proto: Optional[bytes] = Field(default=None, description="zlib compressed serialized CpModelProto")
+    result: Optional[str] = Field(default=None, description="Legacy: optimization result as JSON, events are now stored in scheduled_event")
+    stats: Optional[str] = Field(default=None, description="Solver statistics of the run as JSON")
+    created: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class ScheduledEventRecord(SQLModel, table=True):
+    """
+    One event of a Schedule. Indexed per schedule and resource so the timetable of a group,
+    instructor or venue is a single indexed query.
+    """
+    __tablename__ = "scheduled_event"
+    __table_args__ = (
+        Index("ix_scheduled_event_schedule_group", "schedule_id", "group_id"),
+        Index("ix_scheduled_event_schedule_instructor", "schedule_id", "instructor_id"),
+        Index("ix_scheduled_event_schedule_venue", "schedule_id", "venue_id"),
+        {"extend_existing": True},
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    schedule_id: int = Field(foreign_key="schedule.id", ondelete="CASCADE")
+    title: str
+    days_of_week: int  # 1 = Monday
+    start_time: str  # HH:MM
+    end_time: str
+    activity_id: int
+    group_id: int
+    instructor_id: Optional[int] = None
+    venue_id: Optional[int] = None
+
+    def to_event(self) -> ScheduledEvent:
+        return ScheduledEvent(
+            title=self.title,
+            days_of_week=self.days_of_week,
+            start_time=self.start_time,
+            end_time=self.end_time,
+            activity_id=self.activity_id,
+            group_id=self.group_id,
+            instructor_id=self.instructor_id,
+            venue_id=self.venue_id,
+        )
+
+
+class SolveJob(SQLModel, table=True):
+    """
+    A background Auto-Plan run. Rows are created when the job is queued and updated by the worker process.
+    """
+    __tablename__ = "solve_job"
+    __table_args__ = {"extend_existing": True}
+
+    id: int | None = Field(default=None, primary_key=True)
+    status: JobStatus = Field(default=JobStatus.QUEUED, index=True)
+    schedule_id: Optional[int] = Field(default=None, foreign_key="schedule.id")  # Set once the job is done
+    error: Optional[str] = Field(default=None, description="Traceback of a failed job")
+    created: datetime = Field(default_factory=datetime.utcnow)
+    started: Optional[datetime] = Field(default=None)
+    finished: Optional[datetime] = Field(default=None)
+    stop_requested: bool = Field(default=False)  # Operator asked to keep the best solution found so far
+    warm_start: bool = Field(default=True)  # Hint the search with the latest Schedule
+    disruption_weight: int = Field(default=0)  # Penalty per event moved away from the latest Schedule
+    solver_profile_id: Optional[int] = Field(default=None, foreign_key="solver_profile.id")
+    neighbourhood: Optional[str] = Field(default=None, description="Local re-solve of the latest Schedule, opt.Neighbourhood as JSON")
+    time_limit: Optional[float] = Field(default=None)  # Seconds, overrides the profile
+
+
+class SolveIncumbent(SQLModel, table=True):
+    """
+    An improving solution found while a SolveJob is running.
+    """
+    __tablename__ = "solve_incumbent"
+    __table_args__ = {"extend_existing": True}
+
+    id: int | None = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="solve_job.id", index=True)
+    objective: float
+    bound: float
+    wall_time: float = Field(description="Seconds since the solve started")
+    result: str = Field(description="Incumbent timetable as JSON, {index: ScheduledEvent.to_dict()}")
     created: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -214,29 +346,43 @@ def minutes_to_day_time(total_minutes):
     
     return day_index, f"{hours:02d}:{minutes:02d}"
 
-def day_time_to_minutes(day_str, time_str):
-    # Map Spanish day abbreviations to indices (Mon = 0)
-    day_map = {
-        "mon": 0,  # Monday
-        "tue": 1,  # Tuesday
-        "wed": 2,  # Wednesday
-        "thu": 3,  # Thursday
-        "fri": 4,  # Friday
-        "sat": 5,  # Saturday
-        "sun": 6   # Sunday
-    }
-
-    day_index = day_map.get(day_str)
-    if day_index is None:
-        raise ValueError("Invalid day string")
-
-    # Clean and split time string
-    parts = time_str.strip().split(":")
+def time_to_minutes(t) -> int:
+    """Minutes since midnight of a time, or of an "HH:MM[:SS]" string."""
+    if isinstance(t, time):
+        return t.hour * 60 + t.minute
+    parts = str(t).strip().split(":")
     if len(parts) < 2:
-        raise ValueError(f"Invalid time format: {time_str}")
-    
-    hours = int(parts[0])
-    minutes = int(parts[1])
+        raise ValueError(f"Invalid time format: {t}")
+    return int(parts[0]) * 60 + int(parts[1])
+
 
-    total_minutes = day_index * 1440 + hours * 60 + minutes
-    return total_minutes
+def day_time_to_minutes(day, t):
+    """
+    Minutes since Monday 00:00 of a time on a single day, day is a Day or its value ("mon"...), t a time or "HH:MM".
+    WEEKDAY, WEEKEND and ALL cover several days, expand them with expand_day or use opening_hours.
+    """
+    try:
+        day = Day(day)
+    except ValueError:
+        raise ValueError(f"Invalid day string: {day}") from None
+    days = expand_day(day)
+    if len(days) != 1:
+        raise ValueError(f"{day.value} covers several days, expand it with expand_day()")
+    return days[0] * 1440 + time_to_minutes(t)
+
+
+def day_index_time_to_minutes(day_index, time_str):
+    """Inverse of minutes_to_day_time, day_index 1 is Monday."""
+    hours, minutes = time_str.strip().split(":")[:2]
+    return (day_index - 1) * 1440 + int(hours) * 60 + int(minutes)
+
+
+def expand_day(day: Day) -> List[int]:
+    """Day indices (Mon = 0) covered by a day type."""
+    if day == Day.WEEKDAY:
+        return [0, 1, 2, 3, 4]
+    if day == Day.WEEKEND:
+        return [5, 6]
+    if day == Day.ALL:
+        return [0, 1, 2, 3, 4, 5, 6]
+    return [list(Day).index(day)]
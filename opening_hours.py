@@ -0,0 +1,75 @@
+"""
+Compile DayPlanningTimePeriod rows into weekly opening hours.
+
+Composite day types are expanded with precedence: a specific day (MON...SUN) overrides WEEKDAY or
+WEEKEND, which override ALL. Windows of a day are merged and the result is cached per distinct set
+of rows, so solver setup does no string parsing.
+"""
+from dataclasses import dataclass
+from datetime import time
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+from models import Day, DayPlanningTimePeriod, expand_day, time_to_minutes
+
+DAY_MINUTES = 1440
+
+# Lower wins
+PRECEDENCE = {Day.ALL: 2, Day.WEEKDAY: 1, Day.WEEKEND: 1}
+
+
+@dataclass(frozen=True)
+class OpeningHours:
+    intervals: Tuple[Tuple[int, int], ...]  # Sorted, disjoint (from_minute, to_minute) of the week, Mon 00:00 = 0
+    by_day: Tuple[Tuple[Tuple[int, int], ...], ...]  # Day index (Mon = 0) -> windows as minutes of that day
+
+    def windows(self, day_index: int) -> Tuple[Tuple[int, int], ...]:
+        return self.by_day[day_index]
+
+    def minutes(self) -> int:
+        return sum(end - start for start, end in self.intervals)
+
+
+def window_minutes(opening: time, closing: time) -> Tuple[int, int]:
+    """Minutes of the day, a closing time of 00:00 means midnight at the end of the day."""
+    start, end = time_to_minutes(opening), time_to_minutes(closing)
+    if end == 0 and start > 0:
+        end = DAY_MINUTES
+    return start, end
+
+
+def merge(windows: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Union of windows as sorted, disjoint windows. Touching windows are joined, empty ones dropped."""
+    merged = []
+    for start, end in sorted(w for w in windows if w[0] < w[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def compile_opening_hours(opening_times: Iterable[DayPlanningTimePeriod]) -> OpeningHours:
+    key = tuple(sorted((o.day.value, *window_minutes(o.opening_time, o.closing_time)) for o in opening_times))
+    return _compile(key)
+
+
+@lru_cache(maxsize=64)
+def _compile(key: Tuple[Tuple[str, int, int], ...]) -> OpeningHours:
+    # Windows per day from the most specific day type that covers it
+    chosen = [(len(PRECEDENCE) + 1, []) for _ in range(7)]
+    for day_value, start, end in key:
+        day = Day(day_value)
+        rank = PRECEDENCE.get(day, 0)
+        for d in expand_day(day):
+            if rank < chosen[d][0]:
+                chosen[d] = (rank, [(start, end)])
+            elif rank == chosen[d][0]:
+                chosen[d][1].append((start, end))
+
+    by_day = tuple(tuple(merge(windows)) for _, windows in chosen)
+    intervals = tuple(
+        (d * DAY_MINUTES + start, d * DAY_MINUTES + end)
+        for d, windows in enumerate(by_day) for start, end in windows
+    )
+    return OpeningHours(intervals=intervals, by_day=by_day)
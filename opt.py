@@ -1,7 +1,19 @@
 from ortools.sat.python import cp_model
-from models import Group, Instructor, Venue, Activity, DayPlanningTimePeriod, Day, ScheduledEvent, minutes_to_day_time, day_time_to_minutes
-from typing import List
-from dataclasses import dataclass
+from models import Group, Instructor, Venue, Activity, DayPlanningTimePeriod, Restriction, SolverProfile, TagLink, Unavailability, ScheduledEvent, day_index_time_to_minutes
+from typing import Callable, List, Optional, Union
+from dataclasses import dataclass, field
+from collections import defaultdict
+from compact import CompactInstance, as_compact
+from eligibility import Eligibility
+from restrictions import RestrictionIndex
+from availability import WeeklyAvailability
+from fingerprint import instance_fingerprint
+import model_cache
+import hashlib
+import numpy as np
+import pandas as pd
+import json
+import time
 
 
 
@@ -12,149 +24,554 @@ class Instance:
     venues: List[Venue]
     activities: List[Activity]
     opening_times: List[DayPlanningTimePeriod]
+    tag_links: List[TagLink] = field(default_factory=list)
+    restrictions: List[Restriction] = field(default_factory=list)
+    unavailability: List[Unavailability] = field(default_factory=list)
+
+
+@dataclass
+class Neighbourhood:
+    """
+    The part of a timetable a local re-solve may change: events of any of the groups, venues or
+    instructors, or on any of the days (1 = Monday). Empty selects everything.
+    """
+    group_ids: List[int] = field(default_factory=list)
+    venue_ids: List[int] = field(default_factory=list)
+    instructor_ids: List[int] = field(default_factory=list)
+    days: List[int] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (self.group_ids or self.venue_ids or self.instructor_ids or self.days)
+
+    def contains(self, group_id: int, venue_id: Optional[int], instructor_id: Optional[int], day: int) -> bool:
+        return (self.is_empty() or group_id in self.group_ids or venue_id in self.venue_ids
+                or instructor_id in self.instructor_ids or day in self.days)
+
+
+MODEL_FORMAT = 6  # Bump when construct_model() changes, cached models are then rebuilt
+SOLVED_STATUSES = ("OPTIMAL", "FEASIBLE")  # Statuses with a timetable to keep
+TIME_LABELS = [f"{m // 60:02d}:{m % 60:02d}" for m in range(1440)]  # Minute of the day -> "HH:MM"
 
 
 class TimetableSolver:
     
-    def __init__(self, instance: Instance):
-
-        self.groups = {i.id: i for i in instance.groups}
-        self.instructors = {i.id: i for i in instance.instructors}
-        self.venues = {i.id: i for i in instance.venues}
-        self.activities = {str(i.id) + '_' + str(x): i for i in instance.activities for x in range(1, i.num_sessions + 1)}
-        self.opening_times = {i.id: i for i in instance.opening_times}
-
-        self.valid_intervals = []
-        for o in self.opening_times:
-            window = self.opening_times[o]
-            from_minute = day_time_to_minutes(window.day.value, str(window.opening_time))
-            to_minute = day_time_to_minutes(window.day.value, str(window.closing_time))
-            self.valid_intervals.append((from_minute, to_minute))
-
-        # Sets
-        self.G = [g.id for g in instance.groups]
-        self.I = [i.id for i in instance.instructors]
-        self.V = [v.id for v in instance.venues]
-        self.A = list(self.activities.keys())
+    def __init__(self, instance: Union[Instance, CompactInstance], previous: Optional[List[ScheduledEvent]] = None, disruption_weight: int = 0,
+                 snap_to_step: bool = True, break_symmetry: bool = False, cache_models: bool = False, neighbourhood: Optional[Neighbourhood] = None):
+        """
+        instance: the planning data, or its CompactInstance when one exists already (e.g. a part from split_instance).
+        previous: the events of an earlier timetable, used to warm start the search with solution hints.
+        neighbourhood: re-solve only this part of previous, every other event keeps its slot, venue and instructor.
+        disruption_weight: penalty for every event moved away from its slot in previous, 0 disables it.
+        snap_to_step: only allow starts on each activity's step_minutes grid that end before closing time.
+        break_symmetry: order the interchangeable sessions of an activity. Off by default, it gives worse
+            timetables within the time limit on some instances, see benchmarks.symmetry.
+        cache_models: reuse a model built earlier for the same instance and options, see model_cache.
+        """
+        self.instance = as_compact(instance)
+        compact = self.instance
+
+        # Activities, sessions, groups, venues and instructors are numbered, variables are kept in lists by session
+        self.activities = compact.activity_rows()  # Activity index -> ActivityRow
+        self.activity_index = {a.id: k for k, a in enumerate(self.activities)}
+        self.session_activity = compact.session_activity.tolist()  # Session -> activity index
+        self.sessions = {a.id: list(compact.sessions(k)) for k, a in enumerate(self.activities)}  # Activity id -> sessions
+        self.A = range(compact.session_count)
+
+        # Sets, index -> id
+        self.G = compact.group_ids.tolist()
+        self.I = compact.instructor_ids.tolist()
+        self.V = compact.venue_ids.tolist()
+        self.venue_index = {id: v for v, id in enumerate(self.V)}
+        self.instructor_index = {id: i for i, id in enumerate(self.I)}
+
+        # Composite day types are already expanded, see compile_opening_hours
+        self.opening_hours = compact.opening
+        self.valid_intervals = list(self.opening_hours.intervals)
+
+        # Availability calendars: opening hours, minus the blocked periods of each resource
+        self.opening = WeeklyAvailability.from_intervals(self.valid_intervals)
+        blocked = defaultdict(list)
+        for entity_type, entity_id, start, end in compact.unavailability:
+            blocked[(entity_type, entity_id)].append((start, end))
+        self.blocked = {key: WeeklyAvailability.from_intervals(intervals) & self.opening for key, intervals in blocked.items()}
+        self.calendars = {key: self.opening - blocks for key, blocks in self.blocked.items()}
+        self._any_available = {}
+
+        # Restrictions are parsed once, only eligible (activity, venue) and (activity, instructor) pairs get variables
+        self.restrictions = RestrictionIndex(compact.rules, compact.tag_links)
+        self.eligible_venues = [compact.eligible_venues(k).tolist() for k in range(len(self.activities))]  # Venue indices
+        self.eligible_instructors = [compact.eligible_instructors(k).tolist() for k in range(len(self.activities))]
+        self.eligibility = Eligibility(
+            venues={a.id: [self.V[v] for v in self.eligible_venues[k]] for k, a in enumerate(self.activities)},
+            instructors={a.id: [self.I[i] for i in self.eligible_instructors[k]] for k, a in enumerate(self.activities)},
+        )
 
         self.horizon = 10080  # minutes in a full week
+        self.snap_to_step = snap_to_step
+        self.break_symmetry = break_symmetry
+        self.cache_models = cache_models
+        self.timings = {}  # Seconds spent per stage
 
-    def build(self):
+        # Warm start, keyed by session
+        self.disruption_weight = disruption_weight
+        self.previous_starts = {}
+        self.previous_venues = {}  # Venue ids of the previous events
+        self.previous_instructors = {}
+        if previous:
+            self.load_previous(previous)
 
-        self.model = cp_model.CpModel()
+        # Local re-solve
+        self.neighbourhood = neighbourhood
+        self.fixed = self.fixed_sessions() if neighbourhood is not None else {}
 
-        self.assigned = {
-            a: self.model.new_bool_var(f"{a}_assigned") for a in self.A
-        }
+    def load_previous(self, events: List[ScheduledEvent]):
+        """Map the events of an earlier result onto the sessions of this instance."""
+        by_activity = defaultdict(list)
+        for e in events:
+            by_activity[e.activity_id].append(e)
 
-        self.venue_vars = {
-            a: {v: self.model.new_bool_var(f"{a}_in_{v}") for v in self.V}
-            for a in self.A
+        for activity_id, events in by_activity.items():
+            k = self.activity_index.get(activity_id)
+            if k is None:
+                continue  # Activity removed
+            # Sessions are interchangeable, hand them out in chronological order, extra events are dropped
+            events.sort(key=lambda e: day_index_time_to_minutes(e.days_of_week, e.start_time))
+            for a, e in zip(self.sessions[activity_id], events):
+                self.previous_starts[a] = day_index_time_to_minutes(e.days_of_week, e.start_time)
+                self.previous_venues[a] = e.venue_id
+                self.previous_instructors[a] = e.instructor_id
+
+    def fixed_sessions(self) -> dict:
+        """Session -> (start, venue index, instructor index) of the previous events outside the neighbourhood that can stay."""
+        fixed = {}
+        for a, start in self.previous_starts.items():
+            k = self.session_activity[a]
+            venue, instructor = self.previous_venues[a], self.previous_instructors[a]
+            if self.neighbourhood.contains(self.activities[k].group_id, venue, instructor, start // 1440 + 1):
+                continue
+            # Events whose venue or instructor is no longer eligible, or now blocked at that time, are re-planned.
+            # The start domain only knows that some eligible venue and instructor are free
+            v, i = self.venue_index.get(venue), self.instructor_index.get(instructor)
+            end = start + self.activities[k].duration_minutes
+            if (v in self.eligible_venues[k] and i in self.eligible_instructors[k]
+                    and self.calendar("venue", venue).covers(start, end)
+                    and self.calendar("instructor", instructor).covers(start, end)):
+                fixed[a] = (start, v, i)
+        return fixed
+
+    def calendar(self, kind: str, id: int) -> WeeklyAvailability:
+        return self.calendars.get((kind, id), self.opening)
+
+    def any_available(self, kind: str, ids: List[int]) -> WeeklyAvailability:
+        """Times at least one of the resources is available, cached per candidate set."""
+        key = (kind, tuple(ids))
+        if key not in self._any_available:
+            if any((kind, id) in self.calendars for id in ids):
+                self._any_available[key] = WeeklyAvailability.union_all([self.calendar(kind, id) for id in ids])
+            else:
+                self._any_available[key] = self.opening if ids else WeeklyAvailability()
+        return self._any_available[key]
+
+    def available(self, activity: Activity) -> WeeklyAvailability:
+        """Times the group and at least one eligible venue and instructor of an activity are available."""
+        return WeeklyAvailability.intersect_all([
+            self.calendar("group", activity.group_id),
+            self.any_available("venue", self.eligibility.venues[activity.id]),
+            self.any_available("instructor", self.eligibility.instructors[activity.id]),
+        ])
+
+    def start_domain(self, activity: Activity) -> cp_model.Domain:
+        """
+        Valid start times of an activity: on its step grid (counted from midnight), running in full while
+        it is available, and allowed by its mandatory time rules.
+        """
+        step = activity.step_minutes if self.snap_to_step else 1
+        domain = self.available(activity).start_domain(activity.duration_minutes, step)
+        return self.restrictions.hard_start_domain(activity, domain)
+
+    def build(self, on_solution: Optional[Callable[[List[ScheduledEvent], float, float, float], None]] = None, time_limit: Optional[float] = None,
+              log_search_progress: bool = True, profile: Optional[SolverProfile] = None):
+        """
+        Build, solve and extract in one go. on_solution is called with every improving incumbent.
+        The solver runs with the given profile, or with log_search_progress and a time_limit in seconds.
+        """
+        self.build_model()
+        self.solve(on_solution=on_solution, time_limit=time_limit, log_search_progress=log_search_progress, profile=profile)
+        scheduled_events = self.extract()
+        return scheduled_events, self.model.proto.SerializeToString()
+
+    def model_key(self) -> str:
+        """Cache key of the model: the instance content plus every option that changes the model."""
+        options = {
+            "format": MODEL_FORMAT,
+            "instance": instance_fingerprint(self.instance),
+            "snap_to_step": self.snap_to_step,
+            "break_symmetry": self.break_symmetry,
+            "disruption_weight": self.disruption_weight,
+            # The disruption term is built from the previous starts, hints are added at solve time
+            "previous": sorted(self.previous_starts.items()) if self.disruption_weight else None,
+            "fixed": sorted(self.fixed.items()) if self.neighbourhood is not None else None,
         }
+        return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
 
-        self.instructor_vars = {
-            a: {i: self.model.new_bool_var(f"{a}_in_{i}") for i in self.I}
-            for a in self.A
+    def build_model(self):
+        """Construct the CpModel, or load it from the model cache when nothing changed."""
+        started = time.perf_counter()
+        key = self.model_key() if self.cache_models else None
+        cached = model_cache.load(key) if key else None
+        if cached is not None:
+            self.restore_model(*cached)
+        else:
+            self.construct_model()
+            if key:
+                model_cache.store(key, self.model.proto.SerializeToString(), self.variable_index())
+        self.timings["model"] = time.perf_counter() - started
+
+    def variable_index(self) -> dict:
+        """
+        Proto indices of the variables the solve and extract stages read, as arrays in session order.
+        Venue and instructor literals are (sessions, resource indices, proto indices).
+        """
+        def literals(variables):
+            rows, resources, indices = [], [], []
+            for a, by_resource in enumerate(variables):
+                for r, var in by_resource.items():
+                    rows.append(a)
+                    resources.append(r)
+                    indices.append(var.index)
+            return tuple(np.array(values, dtype=np.int64) for values in (rows, resources, indices))
+
+        return {
+            "assigned": np.array([var.index for var in self.assigned], dtype=np.int64),
+            "starts": np.array([var.index for var in self.starts], dtype=np.int64),
+            "venues": literals(self.venue_vars),
+            "instructors": literals(self.instructor_vars),
         }
 
-        self.starts = {
-            a: self.model.new_int_var_from_domain(cp_model.Domain.FromIntervals(self.valid_intervals),f"{a}")
+    def restore_model(self, proto: bytes, index: dict):
+        loaded = cp_model.CpModel()
+        loaded.proto.ParseFromString(proto)
+        self.model = loaded.clone()  # Rebuilds the variable map from the proto
+        self._extraction = None
+        self.assigned = [self.model.get_bool_var_from_proto_index(i) for i in index["assigned"].tolist()]
+        self.starts = [self.model.get_int_var_from_proto_index(i) for i in index["starts"].tolist()]
+        self.venue_vars = self.restore_literals(index["venues"])
+        self.instructor_vars = self.restore_literals(index["instructors"])
+
+    def restore_literals(self, literals) -> List[dict]:
+        variables = [{} for _ in self.A]
+        for a, r, i in zip(*(values.tolist() for values in literals)):
+            variables[a][r] = self.model.get_bool_var_from_proto_index(i)
+        return variables
+
+    def construct_model(self):
+        self.model = cp_model.CpModel()
+        self._extraction = None
+        activity_of = self.session_activity
+        durations = [self.activities[k].duration_minutes for k in activity_of]  # Per session
+
+        self.assigned = [self.model.new_bool_var(f"assigned_{a}") for a in self.A]
+
+        # Keyed by venue and instructor index
+        self.venue_vars = [
+            {v: self.model.new_bool_var(f"{a}_in_venue_{v}") for v in self.eligible_venues[activity_of[a]]}
             for a in self.A
-        }
+        ]
 
-        self.ends = {
-            a: self.model.new_int_var_from_domain(cp_model.Domain.FromIntervals(self.valid_intervals),f"{a}")
+        self.instructor_vars = [
+            {i: self.model.new_bool_var(f"{a}_from_instructor_{i}") for i in self.eligible_instructors[activity_of[a]]}
             for a in self.A
-        }
+        ]
 
+        # Activities share a domain across their sessions
+        domains = [self.start_domain(activity) for activity in self.activities]
+
+        self.starts = []
         for a in self.A:
-            self.model.add(self.ends[a] == self.starts[a] + self.activities[a].duration_minutes)
-
-        self.venue_intervals = {
-            a: {
-                # We need a separate interval for each venue
-                v: self.model.new_optional_fixed_size_interval_var(
-                    self.starts[a],
-                    self.activities[a].duration_minutes,
-                    self.venue_vars[a][v],
-                    f"{a}_in_{v}"
-                    )
-                    for v in self.V
-            }
+            domain = domains[activity_of[a]]
+            if domain.is_empty():
+                # Does not fit in any opening window, it can only stay unassigned
+                self.starts.append(self.model.new_constant(0))
+                self.model.add(self.assigned[a] == 0)
+            else:
+                self.starts.append(self.model.new_int_var_from_domain(domain, f"start_{a}"))
+
+        opening = cp_model.Domain.FromIntervals(self.valid_intervals)
+        self.ends = [self.model.new_int_var_from_domain(opening, f"end_{a}") for a in self.A]
+
+        for a in self.A:
+            self.model.add(self.ends[a] == self.starts[a] + durations[a]).only_enforce_if(self.assigned[a])
+
+        # We need a separate interval for each venue and each instructor
+        self.venue_intervals = [
+            {v: self.model.new_optional_fixed_size_interval_var(self.starts[a], durations[a], var, f"{a}_in_venue_{v}")
+             for v, var in self.venue_vars[a].items()}
             for a in self.A
-        }
+        ]
 
-        self.instructor_intervals = {
-            a: {
-                # We need a separate intervals for each instructor
-                i: self.model.new_optional_fixed_size_interval_var(
-                    self.starts[a],
-                    self.activities[a].duration_minutes,
-                    self.instructor_vars[a][i],
-                    f"{a}_from_{i}"
-                    )
-                    for i in self.I
-            }
+        self.instructor_intervals = [
+            {i: self.model.new_optional_fixed_size_interval_var(self.starts[a], durations[a], var, f"{a}_from_instructor_{i}")
+             for i, var in self.instructor_vars[a].items()}
             for a in self.A
-        }
+        ]
 
-        self.group_intervals = {
-            # We need a separate intervals for each group
-            a: self.model.new_optional_fixed_size_interval_var(
-                    self.starts[a],
-                    self.activities[a].duration_minutes,
-                    self.assigned[a],
-                    f"{a}"
-                    )
-                    for a in self.A
-                }
+        self.group_intervals = [
+            self.model.new_optional_fixed_size_interval_var(self.starts[a], durations[a], self.assigned[a], f"{a}")
+            for a in self.A
+        ]
 
         # Restrictions
         # HARD Constraints
 
-        # Ensure each activity is assigned to exactly one venue and one instructor
+        # Ensure each assigned activity gets exactly one eligible venue and one eligible instructor
         # TODO: Adjust for capacity. A venue can host an joint activity for two or more groups or two activities at the same time.
         # TODO: A Activity can be given be more than one instructor
         for a in self.A:
-            self.model.add_at_most_one([self.venue_vars[a][v] for v in self.V])
-            self.model.add_at_most_one([self.instructor_vars[a][i] for i in self.I])
+            self.model.add(sum(self.venue_vars[a].values()) == self.assigned[a])
+            self.model.add(sum(self.instructor_vars[a].values()) == self.assigned[a])
 
         # No overlap
-        for g in self.G:
-            self.model.add_no_overlap(self.group_intervals[a] for a in self.A if self.activities[a].group_id == g)
+        # Collect intervals per resource index from the sparse assignments, not the full cross product
+        intervals_by_group = [[] for _ in self.G]
+        intervals_by_venue = [[] for _ in self.V]
+        intervals_by_instructor = [[] for _ in self.I]
+        group_of = self.instance.activity_group.tolist()
+        for a in self.A:
+            intervals_by_group[group_of[activity_of[a]]].append(self.group_intervals[a])
+            for v, interval in self.venue_intervals[a].items():
+                intervals_by_venue[v].append(interval)
+            for i, interval in self.instructor_intervals[a].items():
+                intervals_by_instructor[i].append(interval)
 
-        for v in self.V:
-            self.model.add_no_overlap(self.venue_intervals[a][v] for a in self.A)
+        # Blocked periods of a venue or instructor are fixed intervals in its no overlap,
+        # a group's blocked periods are already cut from its activities' start domains
+        for (kind, id), blocks in self.blocked.items():
+            target, index = {
+                "venue": (intervals_by_venue, self.venue_index),
+                "instructor": (intervals_by_instructor, self.instructor_index),
+            }.get(kind, (None, {}))
+            if id not in index:
+                continue  # A group, or a resource no activity of this instance can use
+            for start, end in blocks.intervals():
+                target[index[id]].append(self.model.new_fixed_size_interval_var(start, end - start, f"{kind}_{id}_blocked_{start}"))
 
-        for i in self.I:
-            self.model.add_no_overlap(self.instructor_intervals[a][i] for a in self.A)
+        for intervals in intervals_by_group + intervals_by_venue + intervals_by_instructor:
+            if intervals:
+                self.model.add_no_overlap(intervals)
+
+        # Local re-solve: events outside the neighbourhood keep their slot, venue and instructor
+        pinned = set()
+        for a, (start, venue, instructor) in self.fixed.items():
+            k = activity_of[a]
+            if not domains[k].contains(start):
+                continue  # The slot is no longer allowed, re-plan the event
+            self.model.add(self.assigned[a] == 1)
+            self.model.add(self.starts[a] == start)
+            self.model.add(self.venue_vars[a][venue] == 1)
+            self.model.add(self.instructor_vars[a][instructor] == 1)
+            pinned.add(k)
+
+        # Symmetry breaking: sessions of an activity are interchangeable, so assigned sessions come first,
+        # in chronological order. Unassigned sessions keep a free start: pinning them to the earliest start
+        # left the single-worker search without any first solution on larger instances
+        if self.break_symmetry:
+            for k, activity in enumerate(self.activities):
+                domain = domains[k]
+                if domain.is_empty() or k in pinned:
+                    continue  # Ordering free sessions around pinned ones would only restrict them
+                sessions = self.sessions[activity.id]
+                for a, b in zip(sessions, sessions[1:]):
+                    self.model.add_implication(self.assigned[b], self.assigned[a])
+                    self.model.add(self.starts[a] + activity.duration_minutes <= self.starts[b]).only_enforce_if(self.assigned[b])
 
         # TODO: DO NOT USE non scheduling windows, prohibided times
         
+        # Minimal disruption: an event stays in its previous slot unless it is flagged as moved
+        self.moved = {}
+        if self.disruption_weight:
+            for a, start in self.previous_starts.items():
+                self.moved[a] = self.model.new_bool_var(f"{a}_moved")
+                self.model.add(self.starts[a] == start).only_enforce_if(~self.moved[a])
+                self.model.add(self.assigned[a] == 1).only_enforce_if(~self.moved[a])
+
+        # SOFT Constraints
+        # A broken rule costs its priority weight, mandatory rules are already in the domains and eligibility
+        self.penalties = []  # (weight, violated literal)
+        soft_rules = [self.restrictions.soft_rules(activity) for activity in self.activities]
+        for a in self.A:
+            for rule in soft_rules[activity_of[a]]:
+                violated = self.model.new_bool_var(f"{a}_breaks_{rule.id}")
+                if rule.has_time_rule():
+                    allowed = self.restrictions.allowed_starts(rule, durations[a])
+                    self.model.add_linear_expression_in_domain(self.starts[a], allowed).only_enforce_if([self.assigned[a], ~violated])
+                for preferred in self.preferred_assignments(a, rule.rule):
+                    self.model.add(sum(preferred) + violated >= self.assigned[a])
+                self.penalties.append((rule.weight, violated))
+
         # OBJECTIVES
-        self.model.maximize(sum(self.assigned[a] for a in self.A))
+        # Scheduling one more activity always outweighs keeping every event in place and every preference
+        assigned_weight = 1 + self.disruption_weight * len(self.moved) + sum(w for w, _ in self.penalties)
+        self.model.maximize(
+            assigned_weight * sum(self.assigned)
+            - self.disruption_weight * sum(self.moved.values())
+            - sum(w * violated for w, violated in self.penalties)
+        )
+
+    def preferred_assignments(self, a: int, rule) -> List[list]:
+        """For each resource requirement of a rule, the assignment literals of session a that satisfy it."""
+        requirements = []
+        if rule.venue_id is not None:
+            requirements.append([var for v, var in self.venue_vars[a].items() if self.V[v] == rule.venue_id])
+        if rule.instructor_id is not None:
+            requirements.append([var for i, var in self.instructor_vars[a].items() if self.I[i] == rule.instructor_id])
+        for entity_type, tag_id in (rule.tag or {}).items():
+            tagged = self.restrictions.tagged[(entity_type, tag_id)]
+            if entity_type == "venue":
+                requirements.append([var for v, var in self.venue_vars[a].items() if self.V[v] in tagged])
+            elif entity_type == "instructor":
+                requirements.append([var for i, var in self.instructor_vars[a].items() if self.I[i] in tagged])
+        return requirements
         
-        # Solve model
+
+    def add_hints(self):
+        """Warm start from the previous schedule. Hints are not part of the cached model."""
+        self.model.clear_hints()
+        for a, start in self.previous_starts.items():
+            self.model.add_hint(self.starts[a], start)
+            self.model.add_hint(self.assigned[a], True)
+            venue = self.venue_index.get(self.previous_venues[a])
+            if venue in self.venue_vars[a]:
+                for v, var in self.venue_vars[a].items():
+                    self.model.add_hint(var, v == venue)
+            instructor = self.instructor_index.get(self.previous_instructors[a])
+            if instructor in self.instructor_vars[a]:
+                for i, var in self.instructor_vars[a].items():
+                    self.model.add_hint(var, i == instructor)
+
+    def solve(self, on_solution: Optional[Callable[[List[ScheduledEvent], float, float, float], None]] = None, time_limit: Optional[float] = None,
+              log_search_progress: bool = True, profile: Optional[SolverProfile] = None):
+        """Solve the built model, see build() for the arguments."""
+        started = time.perf_counter()
+        self.add_hints()
         self.solver = cp_model.CpSolver()
-        self.solver.parameters.log_search_progress = True
-        self.solver.solve(self.model)
+        if profile is not None:
+            profile.apply(self.solver.parameters)
+        else:
+            self.solver.parameters.log_search_progress = log_search_progress
+        if time_limit is not None:
+            self.solver.parameters.max_time_in_seconds = time_limit
+        if on_solution is not None:
+            self.solver.solve(self.model, IncumbentCallback(self, on_solution))
+        else:
+            self.solver.solve(self.model)
+        self.timings["solve"] = time.perf_counter() - started
 
-        # Results
-        scheduled_events = []
-        for a in self.A:
-            # instructor_id = self.instructor_vars[a][i]
-            # venue_id = self.venue_vars[a][i]
-            # Calculate Start, End
-            start_day, start_time = minutes_to_day_time(self.solver.value(self.starts[a]))
-            end_day, end_time = minutes_to_day_time(self.solver.value(self.starts[a]) + self.activities[a].duration_minutes)
-            scheduled_events.append(ScheduledEvent(
-                title=self.activities[a].description,
-                days_of_week=start_day,
-                start_time=start_time,
-                end_time=end_time,
-                activity_id=self.activities[a].id,
-                group_id=self.activities[a].group_id,
-                instructor_id=None,
-                venue_id=None
-                ))
-        return scheduled_events, self.model.Proto().SerializeToString()
\ No newline at end of file
+    def extract(self) -> List[ScheduledEvent]:
+        """Timetable of the last solve, empty when no solution was found."""
+        started = time.perf_counter()
+        scheduled_events = self.extract_events(self.solver.response_proto.solution)
+        self.timings["extract"] = time.perf_counter() - started
+        return scheduled_events
+
+    def extract_frame(self) -> pd.DataFrame:
+        """Timetable of the last solve as a DataFrame with the ScheduledEvent columns."""
+        return pd.DataFrame(self.solution_columns(self.solver.response_proto.solution))
+
+    def stats(self) -> dict:
+        """Statistics of the last solve, stored with the Schedule."""
+        objective = self.solver.objective_value
+        bound = self.solver.best_objective_bound
+        return {
+            "status": self.solver.status_name(),
+            "wall_time": self.solver.wall_time,
+            "branches": self.solver.num_branches,
+            "conflicts": self.solver.num_conflicts,
+            "objective": objective,
+            "bound": bound,
+            "gap": abs(bound - objective) / max(1.0, abs(objective)),
+            "timings": self.timings,
+        }
+
+    def stop(self):
+        """Stop a running solve, build() then returns the best solution found so far."""
+        if getattr(self, "solver", None) is not None:
+            self.solver.stop_search()
+
+    def extraction_index(self) -> dict:
+        """Proto indices and constants extraction reads, as arrays in session order. Built once per model."""
+        if self._extraction is None:
+            index = self.variable_index()
+            compact = self.instance
+            activity_of = compact.session_activity
+            venue_rows, venues, venue_vars = index["venues"]
+            instructor_rows, instructors, instructor_vars = index["instructors"]
+            self._extraction = {
+                "assigned": index["assigned"],
+                "starts": index["starts"],
+                "durations": compact.durations[activity_of],
+                "activity_ids": compact.activity_ids[activity_of],
+                "group_ids": compact.group_ids[compact.activity_group[activity_of]],
+                "titles": np.array(compact.titles, dtype=object)[activity_of],
+                # Resource indices are read back as ids
+                "venues": (venue_rows, compact.venue_ids[venues], venue_vars),
+                "instructors": (instructor_rows, compact.instructor_ids[instructors], instructor_vars),
+            }
+        return self._extraction
+
+    def solution_columns(self, solution) -> dict:
+        """
+        ScheduledEvent fields of the assigned sessions as columns, read from a solution vector
+        (response_proto.solution of a solve or a callback) with array indexing instead of per-variable calls.
+        """
+        columns = ("title", "days_of_week", "start_time", "end_time", "activity_id", "group_id", "instructor_id", "venue_id")
+        if len(solution) == 0 or not self.A:
+            return {c: [] for c in columns}  # No solution found
+        x = self.extraction_index()
+        values = np.asarray(solution, dtype=np.int64)
+
+        def chosen(kind):
+            rows, ids, variables = x[kind]
+            picked = np.full(len(self.A), -1, dtype=np.int64)
+            selected = values[variables] == 1
+            picked[rows[selected]] = ids[selected]
+            return picked
+
+        venue_ids = chosen("venues")
+        instructor_ids = chosen("instructors")
+        rows = np.flatnonzero(values[x["assigned"]] == 1)
+        starts = values[x["starts"]][rows]
+        ends = starts + x["durations"][rows]
+        return {
+            "title": x["titles"][rows].tolist(),
+            "days_of_week": (starts // 1440 % 7 + 1).tolist(),
+            "start_time": [TIME_LABELS[m] for m in (starts % 1440).tolist()],
+            "end_time": [TIME_LABELS[m] for m in (ends % 1440).tolist()],
+            "activity_id": x["activity_ids"][rows].tolist(),
+            "group_id": x["group_ids"][rows].tolist(),
+            "instructor_id": instructor_ids[rows].tolist(),
+            "venue_id": venue_ids[rows].tolist(),
+        }
+
+    def extract_events(self, solution) -> List[ScheduledEvent]:
+        """Events of the assigned sessions in a solution vector, see solution_columns."""
+        columns = self.solution_columns(solution)
+        return [ScheduledEvent(*fields) for fields in zip(*columns.values())]
+
+
+class IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Hands every improving solution to on_solution(events, objective, bound, wall_time) while the search runs.
+    """
+
+    def __init__(self, timetable: TimetableSolver, on_solution: Callable[[List[ScheduledEvent], float, float, float], None]):
+        super().__init__()
+        self.timetable = timetable
+        self.on_solution = on_solution
+
+    def on_solution_callback(self):
+        self.on_solution(
+            self.timetable.extract_events(self.response_proto.solution),
+            self.objective_value,
+            self.best_objective_bound,
+            self.wall_time,
+        )
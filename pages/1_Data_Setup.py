@@ -1,9 +1,10 @@
 import streamlit as st
-from db import get_session, fetch_data
+from db import get_session, fetch_data, save_edits
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 from models import Group, Venue, Instructor, Tag, Activity
+from importer import import_file, SPECS
 import pandas as pd
-from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 
 st.set_page_config(
     page_title="Data Input",
@@ -26,7 +27,18 @@ if "error_toast" in st.session_state and st.session_state.success_toast:
     st.toast(":x: Error: Cannot delete row(s) due to existing references. Remove related records first.")
 
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Groups", "Instructors", "Venues", "Activities", "Tags"])
+def persist(model, original, edited, columns=(), delete=False):
+    """Save the changed rows of an editor table, or delete its ticked rows, in one transaction."""
+    try:
+        save_edits(model, original, edited, list(columns), delete_column="Delete" if delete else None)
+    except IntegrityError:
+        st.error(f"❌ Error: Cannot delete row(s) due to existing references. Remove related records first.")  # Show error if deletion blocked due to foreign key constraint
+        return
+    st.session_state.success_toast = True  # Set flag to show toast after rerun
+    st.rerun()  # Force rerun
+
+
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Groups", "Instructors", "Venues", "Activities", "Tags", "Import"])
 
 with tab1:
 
@@ -71,27 +83,10 @@ with tab1:
 
     # 📌 Save Changes
     if st.button("Update Groups"):
-        with get_session() as session:
-            for index, row in edited_df.iterrows():
-                group = session.exec(select(Group).where(Group.id == row["id"])).first()
-                group.name = row["name"]
-                group.gender = row["gender"]
-                group.age_group = row["age_group"]
-                session.commit()
-        st.session_state.success_toast = True  # Set flag to show toast after rerun
-        st.rerun()  # Force rerun
-    
+        persist(Group, df_group, edited_df, ["name", "gender", "age_group"])
+
     if st.button("Delete Groups"):
-        # Delete selected groups
-        delete_ids = edited_df[edited_df["Delete"]]["id"].tolist()
-        if delete_ids:
-            try:
-                session.exec(delete(Group).where(Group.id.in_(delete_ids)))
-                session.commit()
-                st.session_state.success_toast = True  # Set flag to show toast after rerun
-                st.rerun()  # Force rerun
-            except Exception as e:
-                st.error(f"❌ Error: Cannot delete row(s) due to existing references. Remove related records first.")  # Show error if deletion blocked due to foreign key constraint
+        persist(Group, df_group, edited_df, delete=True)
 
     # 📌 Add Group Modal
     @st.dialog("Add New Group")
@@ -132,29 +127,10 @@ with tab2:
 
     # 📌 Save Changes
     if st.button("Update Instructors"):
-        with get_session() as session:
+        persist(Instructor, df, edited_df, ["name"])
 
-            # Update remaining instructors
-            for index, row in edited_df.iterrows():
-                session.exec(
-                    select(Instructor)
-                    .where(Instructor.id == row["id"])
-                ).first().name = row["name"]
-            session.commit()
-            st.session_state.success_toast = True  # Set flag to show toast after rerun
-            st.rerun()  # Force rerun
-    
     if st.button("Delete Instructors"):
-        # Delete selected instructors
-        delete_ids = edited_df[edited_df["Delete"]]["id"].tolist()
-        if delete_ids:
-            try:
-                session.exec(delete(Instructor).where(Instructor.id.in_(delete_ids)))
-                session.commit()
-                st.session_state.success_toast = True  # Set flag to show toast after rerun
-                st.rerun()  # Force rerun
-            except Exception as e:
-                st.error(f"❌ Error: Cannot delete row(s) due to existing references. Remove related records first.")  # Show error if deletion blocked due to foreign key constraint
+        persist(Instructor, df, edited_df, delete=True)
 
     # 📌 Add Instructor Modal
     @st.dialog("Add New Instructor")
@@ -193,25 +169,10 @@ with tab3:
     )
 
     if st.button("Update Venues"):
-        with get_session() as session:
-            for index, row in edited_df.iterrows():
-                venue = session.exec(select(Venue).where(Venue.id == row["id"])).first()
-                venue.name = row["name"]
-                session.commit()
-        st.session_state.success_toast = True  # Set flag to show toast after rerun
-        st.rerun()  # Force rerun
+        persist(Venue, df, edited_df, ["name"])
 
     if st.button("Delete Venues"):
-        # Delete selected Venues
-        delete_ids = edited_df[edited_df["Delete"]]["id"].tolist()
-        if delete_ids:
-            try:
-                session.exec(delete(Venue).where(Venue.id.in_(delete_ids)))
-                session.commit()
-                st.session_state.success_toast = True  # Set flag to show toast after rerun
-                st.rerun()  # Force rerun
-            except Exception as e:
-                st.error(f"❌ Error: Cannot delete row(s) due to existing references. Remove related records first.")  # Show error if deletion blocked due to foreign key constraint
+        persist(Venue, df, edited_df, delete=True)
 
     # 📌 Add Venue Modal
     @st.dialog("Add New Venue")
@@ -249,25 +210,10 @@ with tab5:
     )
 
     if st.button("Update Tags"):
-        with get_session() as session:
-            for index, row in edited_df_tag.iterrows():
-                tag = session.exec(select(Tag).where(Tag.id == row["id"])).first()
-                tag.name = row["name"]
-                session.commit()
-        st.session_state.success_toast = True  # Set flag to show toast after rerun
-        st.rerun()
+        persist(Tag, df_tag, edited_df_tag, ["name"])
 
     if st.button("Delete Tags"):
-        # Delete selected Venues
-        delete_ids = edited_df_tag[edited_df_tag["Delete"]]["id"].tolist()
-        if delete_ids:
-            try:
-                session.exec(delete(Tag).where(Tag.id.in_(delete_ids)))
-                session.commit()
-                st.session_state.success_toast = True  # Set flag to show toast after rerun
-                st.rerun()  # Force rerun
-            except Exception as e:
-                st.error(f"❌ Error: Cannot delete row(s) due to existing references. Remove related records first.")  # Show error if deletion blocked due to foreign key constraint
+        persist(Tag, df_tag, edited_df_tag, delete=True)
 
 
     @st.dialog("Add New Tag")
@@ -325,33 +271,11 @@ with tab4:
 
     # 📌 Save Changes
     if st.button("Update Activities"):
-        with get_session() as session:
-            for index, row in edited_df.iterrows():
-                activity = session.exec(
-                    select(Activity)
-                    .where(Activity.id == row["id"])
-                ).first()
-                if activity:
-                    activity.description = row["description"]
-                    activity.duration_minutes = row["duration_minutes"]
-                    activity.num_sessions = row["num_sessions"]
-                    activity.group_id = group_options.get(row["Group"])
-                    activity.step_minutes = row["step_minutes"]
-            session.commit()
-        st.session_state.success_toast = True  # Set flag to show toast after rerun
-        st.rerun()  # Force rerun
+        edited_df["group_id"] = edited_df["Group"].map(group_options)  # Convert group name → group_id
+        persist(Activity, df, edited_df, ["description", "duration_minutes", "num_sessions", "step_minutes", "group_id"])
 
     if st.button("Delete Activities"):
-        # Delete selected Venues
-        delete_ids = edited_df[edited_df["Delete"]]["id"].tolist()
-        if delete_ids:
-            try:
-                session.exec(delete(Activity).where(Activity.id.in_(delete_ids)))
-                session.commit()
-                st.session_state.success_toast = True  # Set flag to show toast after rerun
-                st.rerun()  # Force rerun
-            except Exception as e:
-                st.error(f"❌ Error: Cannot delete row(s) due to existing references. Remove related records first.")  # Show error if deletion blocked due to foreign key constraint
+        persist(Activity, df, edited_df, delete=True)
 
     # 📌 Add Activity Modal
     @st.dialog("Add New Activity")
@@ -373,3 +297,31 @@ with tab4:
     # Trigger Add New Activity modal when the button is clicked
     if st.button("Add New Activity"):
         add_activity_form()
+
+with tab6:
+    st.title("Import")
+    st.write("Load many records at once from a CSV, Parquet or Excel file with one row per record. Activities refer to their group by name, so import groups first. Rows that fail validation are skipped and listed below, the other rows are saved.")
+
+    kind = st.selectbox("Records", options=list(SPECS), format_func=str.capitalize)
+    st.caption("Required columns: " + ", ".join(SPECS[kind].columns))
+    uploaded = st.file_uploader("File", type=["csv", "parquet", "xlsx"])
+    dry_run = st.checkbox("Only validate", help="Check the file without saving anything.")
+
+    if uploaded is not None and st.button("Import"):
+        try:
+            with st.spinner("Importing..."):
+                report = import_file(kind, uploaded, file_name=uploaded.name, dry_run=dry_run)
+        except (ValueError, ImportError) as e:
+            st.error(f"❌ Error: {e}")
+        else:
+            cols = st.columns(4)
+            cols[0].metric("Rows", report.rows)
+            cols[1].metric("Valid" if dry_run else "Imported", report.inserted)
+            cols[2].metric("Errors", report.error_count)
+            cols[3].metric("Seconds", f"{report.seconds:.1f}")
+            if report.errors:
+                if report.error_count > len(report.errors):
+                    st.caption(f"Showing the first {len(report.errors)} of {report.error_count} errors.")
+                st.dataframe(pd.DataFrame([{"Row": e.row, "Error": e.message} for e in report.errors]), hide_index=True, use_container_width=True)
+            elif not dry_run:
+                st.toast("✅ Success! Your changes have been saved.")
@@ -1,11 +1,13 @@
 import streamlit as st
+import pandas as pd
 import datetime
 from db import fetch_data, get_session, fetch_objs
-from models import DayPlanningTimePeriod, Day, Venue, Instructor, Group, Activity, Schedule, minutes_to_day_time
+from models import DayPlanningTimePeriod, Day, Unavailability, Venue, Instructor, Group
+from sqlalchemy import delete
 from datetime import time
-from opt import Instance, TimetableSolver
+from precheck import find_conflict
+from sidebar import auto_plan_sidebar
 from streamlit_calendar import calendar
-import json
 
 
 st.set_page_config(
@@ -19,23 +21,37 @@ st.set_page_config(
 
 st.title(":calendar: Scheduling Parameters")
 
-if st.sidebar.button("Auto-Plan"):
-    instructors = fetch_objs(Instructor)
-    groups = fetch_objs(Group)
-    venues = fetch_objs(Venue)
-    activities = fetch_objs(Activity)
-    opening_hours = fetch_objs(DayPlanningTimePeriod)
-
-    new_instance = Instance(groups=groups, instructors=instructors, venues=venues, activities=activities, opening_times=opening_hours)
-
-    solver = TimetableSolver(instance=new_instance)
-    scheduled_activities, proto = solver.build()
-    with get_session() as session:
-        session.add(Schedule(
-            proto=proto,
-            result=json.dumps({i: e.to_dict() for i, e in enumerate(scheduled_activities)})
-            ))
-        session.commit()
+CONFLICT_SEARCH_SECONDS = 5  # The search runs in the script thread, keep the page responsive
+
+instance, report = auto_plan_sidebar()
+
+st.write("## Capacity Check")
+st.write("Session minutes each group, venue pool and instructor pool must host, against the minutes they are available.")
+if report.capacity:
+    st.dataframe(pd.DataFrame([{
+        "Type": c.kind,
+        "Resources": ", ".join(c.names),
+        "Activities": len(c.activity_ids),
+        "Demand (min)": c.demand,
+        "Capacity (min)": c.capacity,
+        "Load": f"{c.demand / c.capacity:.0%}" if c.capacity else "-",
+        "Fits": not c.overloaded,
+    } for c in report.capacity]), hide_index=True, use_container_width=True)
+if not report.ok:
+    # The cheap checks already explain it, a CP-SAT conflict search would only take longer to say less
+    st.error("Not everything can be planned:\n\n" + "\n".join(f"- {e}" for e in report.errors()))
+elif st.button("Find conflicting activities", help=f"Search, for at most {CONFLICT_SEARCH_SECONDS} seconds, a smallest set of activities that cannot all be planned in full."):
+    with st.spinner(f"Searching (at most {CONFLICT_SEARCH_SECONDS} seconds)..."):
+        conflict = find_conflict(instance, time_limit=CONFLICT_SEARCH_SECONDS)
+    descriptions = {a.id: a.description for a in instance.activities}
+    if conflict is None:
+        st.warning(f"No conflict found within {CONFLICT_SEARCH_SECONDS} seconds. The activities may still not all fit, an Auto-Plan run will tell.")
+    elif not conflict.activity_ids:
+        st.success("All activities can be planned in full.")
+    else:
+        st.error("These activities cannot all be planned in full: " + ", ".join(descriptions[id] for id in conflict.activity_ids))
+        if not conflict.minimal:
+            st.caption("The time limit ran out before the set was narrowed down, some of these may fit after all.")
 
 st.write("## Define Scheduling Times")
 df = fetch_data(DayPlanningTimePeriod)
@@ -64,6 +80,61 @@ def add_day_form():
             st.session_state.success_toast = True  # Set flag to show toast after rerun
             st.rerun()  # Force rerun
 
+st.write("## Unavailability")
+st.write("Block weekly periods for a venue, instructor or group, e.g. an instructor's day off or venue maintenance.")
+
+resource_options = {
+    "venue": {v.name: v.id for v in fetch_objs(Venue)},
+    "instructor": {i.name: i.id for i in fetch_objs(Instructor)},
+    "group": {g.name: g.id for g in fetch_objs(Group)},
+}
+df_unavailable = fetch_data(Unavailability)
+if not df_unavailable.empty:
+    names = {(kind, id): name for kind, options in resource_options.items() for name, id in options.items()}
+    df_unavailable["Resource"] = [names.get((k, i), "") for k, i in zip(df_unavailable["entity_type"], df_unavailable["entity_id"])]
+    df_unavailable["Delete"] = False
+    edited_unavailable = st.data_editor(
+        df_unavailable,
+        key="unavailability_editor",
+        hide_index=True,
+        disabled=["entity_type", "Resource", "day", "start_time", "end_time", "reason"],
+        column_order=["entity_type", "Resource", "day", "start_time", "end_time", "reason", "Delete"],
+    )
+    if st.button("Delete Unavailability"):
+        delete_ids = edited_unavailable[edited_unavailable["Delete"]]["id"].tolist()
+        if delete_ids:
+            with get_session() as session:
+                session.exec(delete(Unavailability).where(Unavailability.id.in_(delete_ids)))
+                session.commit()
+            st.rerun()
+
+
+@st.dialog("Add Unavailability")
+def add_unavailability_form():
+    entity_type = st.selectbox("Resource type", list(resource_options))
+    with st.form("add_unavailability"):
+        resource = st.selectbox("Resource", list(resource_options[entity_type]))
+        day = st.selectbox("Day", [d.value for d in Day])
+        start_time = st.time_input("From", value=time(9, 0))
+        end_time = st.time_input("To", value=time(12, 0))
+        reason = st.text_input("Reason")
+        if st.form_submit_button("Add") and resource:
+            with get_session() as session:
+                session.add(Unavailability(
+                    entity_type=entity_type,
+                    entity_id=resource_options[entity_type][resource],
+                    day=Day(day),
+                    start_time=start_time,
+                    end_time=end_time,
+                    reason=reason or None,
+                ))
+                session.commit()
+            st.rerun()
+
+
+if st.button("Add Unavailability"):
+    add_unavailability_form()
+
 # Constraints Section
 st.header("⚡ Define Constraints")
 st.markdown(
@@ -2,9 +2,13 @@ import streamlit as st
 import datetime
 import json
 from db import fetch_data, get_session, fetch_objs
-from models import DayPlanningTimePeriod, Schedule, Activity, minutes_to_day_time
+from models import DayPlanningTimePeriod, Schedule, Activity, Group, Venue, Instructor, ScheduledEvent, minutes_to_day_time
 from datetime import time
-from opt import Instance, TimetableSolver
+from jobs import fetch_running_jobs, latest_incumbent, recover_orphaned_jobs, request_stop, submit_solve_job
+from opt import Neighbourhood
+from schedules import schedule_history, count_schedules, schedule_events
+from conflicts import ConflictIndex
+from opening_hours import compile_opening_hours
 from streamlit_calendar import calendar
 
 
@@ -22,21 +26,81 @@ st.title(":calendar: Calendar View")
 
 # Write Calendar events
 activities = fetch_objs(Activity)
-schedules = fetch_objs(Schedule)
-scheduled_activities = json.loads(schedules[-1].result)
+
+# Show the best timetable so far while a solve is still running
+recover_orphaned_jobs()  # Jobs of a previous server process are not running any more
+running_jobs = fetch_running_jobs()
+incumbent = latest_incumbent(running_jobs[-1].id) if running_jobs else None
+if incumbent is not None:
+    st.info(
+        f"Solve job #{incumbent.job_id} is still running. Showing the best timetable so far: "
+        f"objective {incumbent.objective:.0f} (bound {incumbent.bound:.0f}), found after {incumbent.wall_time:.1f}s."
+    )
+    if st.button("Stop and keep this timetable"):
+        request_stop(incumbent.job_id)
+        st.toast("Stop requested, the job will save its best timetable.")
+    if st.button("Refresh"):
+        st.rerun()
+    scheduled_activities = list(json.loads(incumbent.result).values())
+else:
+    # Only one page of history is loaded, without the proto blobs
+    page_size = 20
+    pages = max(1, -(-count_schedules() // page_size))
+    page = st.sidebar.number_input("History page", min_value=1, max_value=pages, value=1) - 1 if pages > 1 else 0
+    history = schedule_history(page=page, page_size=page_size)
+    if not history:
+        st.info("No timetable yet, run Auto-Plan on the Scheduling Parameters page.")
+        st.stop()
+    labels = {f"#{s.id} ({s.created:%Y-%m-%d %H:%M})": s for s in history}
+    schedule = labels[st.sidebar.selectbox("Timetable", options=list(labels), help="Newest first.")]
+    scheduled_activities = [e.to_dict() for e in schedule_events(schedule.id)]
+    if schedule.stats:
+        stats = json.loads(schedule.stats)
+        cols = st.columns(5)
+        cols[0].metric("Status", stats["status"])
+        cols[1].metric("Wall time (s)", f"{stats['wall_time']:.1f}")
+        cols[2].metric("Gap", f"{stats['gap']:.1%}")
+        cols[3].metric("Branches", stats["branches"])
+        cols[4].metric("Conflicts", stats["conflicts"])
+        if stats.get("profile"):
+            st.caption(f"Solver profile: {stats['profile']}")
+
+# 📌 Check the timetable for overlaps and events outside the opening hours
+conflict_index = ConflictIndex([ScheduledEvent(**e) for e in scheduled_activities], compile_opening_hours(fetch_objs(DayPlanningTimePeriod)))
+names = {
+    "group": {g.id: g.name for g in fetch_objs(Group)},
+    "venue": {v.id: v.name for v in fetch_objs(Venue)},
+    "instructor": {i.id: i.name for i in fetch_objs(Instructor)},
+}
+
+
+def describe(conflict):
+    day, start = minutes_to_day_time(conflict.start)
+    event = conflict_index.events[conflict.event].title
+    if conflict.kind == "opening":
+        return f"{event} runs outside the opening hours"
+    other = conflict_index.events[conflict.other].title
+    resource = names[conflict.kind].get(conflict.resource_id, conflict.resource_id)
+    return f"{event} and {other} overlap for {conflict.kind} {resource} on day {day} at {start}"
+
+
+conflicts = conflict_index.validate()
+if conflicts:
+    with st.expander(f"⚠️ {len(conflicts)} conflict(s) in this timetable"):
+        st.write("\n".join(f"- {describe(c)}" for c in conflicts))
 
 events = []
-for a in scheduled_activities:
-    activity = [x for x in activities if x.id == scheduled_activities[a]['activity_id']][0]
+for i, e in enumerate(scheduled_activities):
     events.append({
-        "title": scheduled_activities[a]['title'],
-        "daysOfWeek": [scheduled_activities[a]['days_of_week']],  # Recurring
-        "startTime": scheduled_activities[a]["start_time"],
-        "endTime": scheduled_activities[a]['end_time'],
-        "resourceId": scheduled_activities[a]["group_id"],
+        "id": str(i),  # Index into conflict_index.events
+        "title": e['title'],
+        "daysOfWeek": [e['days_of_week']],  # Recurring
+        "startTime": e["start_time"],
+        "endTime": e['end_time'],
+        "resourceId": e["group_id"],
         "extendedProps": {
-            "teacherId": scheduled_activities[a]['instructor_id'],
-            "venueId": scheduled_activities[a]['venue_id'],
+            "teacherId": e['instructor_id'],
+            "venueId": e['venue_id'],
         }
     })
 
@@ -68,5 +132,35 @@ calendar_options = {
 calendar = calendar(
     events=events,
     options=calendar_options,
+    callbacks=["eventChange"],
     key='calendar', # Assign a widget key to prevent state loss
     )
+
+# 📌 Instant feedback on a dragged event, the other events stay where they are
+if calendar.get("eventChange"):
+    moved = calendar["eventChange"]["event"]
+    start = datetime.datetime.fromisoformat(moved["start"])
+    minute = start.weekday() * 1440 + start.hour * 60 + start.minute
+    move_conflicts = conflict_index.check_move(int(moved["id"]), minute)
+    if move_conflicts:
+        st.error("This move creates conflicts:\n\n" + "\n".join(f"- {describe(c)}" for c in move_conflicts))
+    else:
+        st.success(f"{moved['title']} fits at its new time.")
+
+# 📌 Re-plan part of the latest timetable, everything outside the selection stays as it is
+if incumbent is None and page == 0 and schedule.id == history[0].id:
+    st.write("## Repair")
+    st.write("Re-plan only the events of the selected groups, venues, instructors or days, e.g. after an instructor calls in sick. Add their unavailability first.")
+    day_names = {1: "Mon", 2: "Tue", 3: "Wed", 4: "Thu", 5: "Fri", 6: "Sat", 7: "Sun"}
+    cols = st.columns(4)
+    group_ids = cols[0].multiselect("Groups", options=list(names["group"]), format_func=names["group"].get)
+    venue_ids = cols[1].multiselect("Venues", options=list(names["venue"]), format_func=names["venue"].get)
+    instructor_ids = cols[2].multiselect("Instructors", options=list(names["instructor"]), format_func=names["instructor"].get)
+    days = cols[3].multiselect("Days", options=list(day_names), format_func=day_names.get)
+    repair_time = st.slider("Time limit (s)", min_value=1, max_value=60, value=10)
+    keep_stable = st.checkbox("Move as few of the selected events as possible", value=True)
+    neighbourhood = Neighbourhood(group_ids=group_ids, venue_ids=venue_ids, instructor_ids=instructor_ids, days=days)
+    if st.button("Re-plan selection", disabled=neighbourhood.is_empty()):
+        job_id = submit_solve_job(disruption_weight=1 if keep_stable else 0, neighbourhood=neighbourhood, time_limit=repair_time)
+        st.success(f"Repair job #{job_id} queued.")
+        st.page_link("pages/5_Solve_Jobs.py", label="Follow progress", icon="⏳")
@@ -0,0 +1,64 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from jobs import fetch_jobs, request_stop, latest_incumbent, recover_orphaned_jobs, MAX_CONCURRENT_SOLVES
+from models import JobStatus
+from sidebar import auto_plan_sidebar
+
+
+st.set_page_config(
+    page_title="Solve Jobs",
+    page_icon=":hourglass:",
+    initial_sidebar_state="expanded",
+    layout="wide",
+    menu_items={
+        'About': "# This is a demo page. Use without warranty."
+    }
+)
+
+st.title(":hourglass: Solve Jobs")
+recover_orphaned_jobs()  # Jobs of a previous server process are not running any more
+st.write(f"Auto-Plan runs in the background. At most {MAX_CONCURRENT_SOLVES} solves run at once, further jobs wait in the queue.")
+
+auto_plan_sidebar(link_jobs_page=False)
+
+
+def seconds_between(start, end):
+    if start is None:
+        return None
+    return round(((end or datetime.utcnow()) - start).total_seconds(), 1)
+
+
+# 📌 Poll the job table, only this fragment reruns
+@st.fragment(run_every=2)
+def job_table():
+    jobs = fetch_jobs()
+    if not jobs:
+        st.info("No solve jobs yet.")
+        return
+
+    incumbents = {job.id: latest_incumbent(job.id) for job in jobs if job.status == JobStatus.RUNNING}
+    df = pd.DataFrame([{
+        "Job": job.id,
+        "Status": job.status.value,
+        "Queued": job.created,
+        "Waiting (s)": seconds_between(job.created, job.started),
+        "Running (s)": seconds_between(job.started, job.finished),
+        "Best objective": incumbents[job.id].objective if incumbents.get(job.id) else None,
+        "Bound": incumbents[job.id].bound if incumbents.get(job.id) else None,
+        "Schedule": job.schedule_id,
+    } for job in jobs])
+    st.dataframe(df, hide_index=True, use_container_width=True)
+
+    for job_id, incumbent in incumbents.items():
+        if incumbent is not None and st.button(f"Stop job #{job_id} and keep the best timetable", key=f"stop_{job_id}"):
+            request_stop(job_id)
+            st.toast(f"Stop requested for job #{job_id}.")
+
+    for job in jobs:
+        if job.status == JobStatus.FAILED and job.error:
+            with st.expander(f"Job #{job.id} failed"):
+                st.code(job.error)
+
+
+job_table()
@@ -0,0 +1,202 @@
+"""
+Pre-solve feasibility and capacity analysis.
+
+Cheap necessary conditions checked before CP-SAT runs: every activity needs a non-empty start domain,
+and the session minutes that must share a group, or a pool of venues/instructors, cannot exceed the
+time that group or pool is available. find_conflict runs a CP-SAT query with one assumption per
+activity and shrinks the infeasible core to a minimal set of activities that cannot all be planned.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from opt import Instance, TimetableSolver
+
+
+@dataclass
+class EmptyDomain:
+    activity_id: int
+    description: str
+    reason: str
+
+
+@dataclass
+class CapacityCheck:
+    kind: str  # group, venue or instructor
+    ids: List[int]  # The pool of resources the activities must share
+    names: List[str]
+    activity_ids: List[int]  # Activities that can only use this pool
+    demand: int  # Session minutes
+    capacity: int  # Available minutes of the pool
+
+    @property
+    def overloaded(self) -> bool:
+        return self.demand > self.capacity
+
+
+@dataclass
+class PrecheckReport:
+    empty_domains: List[EmptyDomain] = field(default_factory=list)
+    capacity: List[CapacityCheck] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.empty_domains and not any(c.overloaded for c in self.capacity)
+
+    def errors(self) -> List[str]:
+        errors = [f"{e.description} cannot be planned: {e.reason}." for e in self.empty_domains]
+        for c in self.capacity:
+            if c.overloaded:
+                errors.append(f"{c.kind.capitalize()} {', '.join(c.names)}: {c.demand} session minutes "
+                              f"but only {c.capacity} minutes available.")
+        return errors
+
+
+def check_instance(instance: Instance, solver: Optional[TimetableSolver] = None) -> PrecheckReport:
+    """Runs without building a model, solver can be passed when one exists for the instance."""
+    solver = solver or TimetableSolver(instance)
+    report = PrecheckReport()
+    if not instance.activities:
+        return report
+
+    for activity in instance.activities:
+        if solver.start_domain(activity).is_empty():
+            report.empty_domains.append(EmptyDomain(activity.id, activity.description, _empty_reason(solver, activity)))
+
+    activity_ids = np.array([a.id for a in instance.activities])
+    demand = np.array([a.duration_minutes * a.num_sessions for a in instance.activities], dtype=np.int64)
+
+    # Groups: sessions of a group never overlap
+    group_ids = np.array([a.group_id for a in instance.activities])
+    for g in instance.groups:
+        mask = group_ids == g.id
+        if mask.any():
+            report.capacity.append(CapacityCheck(
+                kind="group",
+                ids=[g.id],
+                names=[g.name],
+                activity_ids=activity_ids[mask].tolist(),
+                demand=int(demand[mask].sum()),
+                capacity=solver.calendar("group", g.id).minutes(),
+            ))
+
+    report.capacity += _pool_checks("venue", instance.venues, solver.eligibility.venues, solver, activity_ids, demand)
+    report.capacity += _pool_checks("instructor", instance.instructors, solver.eligibility.instructors, solver, activity_ids, demand)
+    return report
+
+
+def _pool_checks(kind: str, resources: list, eligible: dict, solver: TimetableSolver, activity_ids: np.ndarray,
+                 demand: np.ndarray) -> List[CapacityCheck]:
+    """
+    Hall-type check: for every distinct eligibility set, and for all resources together, the activities
+    that can only use resources of that set must fit in their combined availability.
+    """
+    if not resources:
+        return []
+    ids = np.array([r.id for r in resources])
+    names = np.array([r.name for r in resources], dtype=object)
+    column = {id: j for j, id in enumerate(ids.tolist())}
+
+    # Activity x resource eligibility matrix
+    matrix = np.zeros((len(activity_ids), len(ids)), dtype=bool)
+    for row, activity_id in enumerate(activity_ids.tolist()):
+        matrix[row, [column[r] for r in eligible[activity_id]]] = True
+    minutes = np.array([solver.calendar(kind, id).minutes() for id in ids.tolist()], dtype=np.int64)
+
+    pools = np.unique(np.vstack([matrix[matrix.any(axis=1)], np.ones(len(ids), dtype=bool)]), axis=0)
+    checks = []
+    for pool in pools:
+        # Activities eligible for a subset of the pool
+        inside = ~(matrix & ~pool).any(axis=1) & matrix.any(axis=1)
+        if not inside.any():
+            continue
+        checks.append(CapacityCheck(
+            kind=kind,
+            ids=ids[pool].tolist(),
+            names=names[pool].tolist(),
+            activity_ids=activity_ids[inside].tolist(),
+            demand=int(demand[inside].sum()),
+            capacity=int(minutes[pool].sum()),
+        ))
+    return checks
+
+
+def _empty_reason(solver: TimetableSolver, activity) -> str:
+    if not solver.eligibility.venues[activity.id]:
+        return "no venue is eligible"
+    if not solver.eligibility.instructors[activity.id]:
+        return "no instructor is eligible"
+    available = solver.available(activity)
+    if not available.minutes():
+        return "its group, venues and instructors are never available at the same time"
+    step = activity.step_minutes if solver.snap_to_step else 1
+    if not available.start_mask(activity.duration_minutes, step).any():
+        longest = max(end - start for start, end in available.intervals())
+        return f"it takes {activity.duration_minutes} minutes, the longest available window is {longest} minutes"
+    return "its mandatory time restrictions exclude every available start"
+
+
+@dataclass
+class ConflictCore:
+    activity_ids: List[int]  # Empty when every activity fits
+    minimal: bool  # False when the time limit ran out before the core was shrunk
+
+
+def find_conflict(instance: Instance, time_limit: float = 10.0) -> Optional[ConflictCore]:
+    """
+    Activity ids that cannot all be planned in full together, minimal in the sense that planning
+    any one of them less makes the rest fit. time_limit bounds the whole search: when it runs out
+    while the core is shrunk, the core found so far is returned, conflicting but maybe not minimal.
+    None when not even the first check finished.
+    """
+    deadline = time.perf_counter() + time_limit
+    timetable = TimetableSolver(instance, break_symmetry=False)
+    timetable.construct_model()
+    model = timetable.model
+    model.clear_objective()  # Only feasibility matters
+
+    # One literal per activity: all its sessions are assigned
+    literals = {}
+    for activity in instance.activities:
+        literal = model.new_bool_var(f"plan_{activity.id}")
+        model.add_bool_and([timetable.assigned[a] for a in timetable.sessions[activity.id]]).only_enforce_if(literal)
+        literals[activity.id] = literal
+
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = 1  # Cores are reported by the sequential search
+
+    def infeasible(activity_ids: List[int]) -> Optional[bool]:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        solver.parameters.max_time_in_seconds = remaining
+        model.clear_assumptions()
+        model.add_assumptions([literals[id] for id in activity_ids])
+        status = solver.solve(model)
+        if status == cp_model.INFEASIBLE:
+            return True
+        if status in (cp_model.FEASIBLE, cp_model.OPTIMAL):
+            return False
+        return None
+
+    result = infeasible(list(literals))
+    if result is None:
+        return None
+    if not result:
+        return ConflictCore([], minimal=True)
+
+    by_index = {literal.index: id for id, literal in literals.items()}
+    core = [by_index[i] for i in solver.sufficient_assumptions_for_infeasibility() if i in by_index] or list(literals)
+
+    # Deletion filter: drop every activity the conflict does not need
+    for activity_id in list(core):
+        rest = [id for id in core if id != activity_id]
+        result = infeasible(rest)
+        if result is None:
+            return ConflictCore(core, minimal=False)
+        if result:
+            core = rest
+    return ConflictCore(core, minimal=True)
@@ -0,0 +1,121 @@
+"""
+Restriction compiler.
+
+Every Restriction row is parsed once and indexed by the activity, group or activity tag it selects.
+Mandatory time rules become pruned start domains, mandatory resource rules become eligibility
+(see eligibility.py). Only rules with a lower Priority turn into weighted objective terms.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+from ortools.sat.python import cp_model
+
+from models import Activity, ActivityRestriction, Priority, expand_day
+
+# Objective penalty of breaking a soft rule once
+PRIORITY_WEIGHT = {
+    Priority.HIGH: 100,
+    Priority.MEDIUM: 10,
+    Priority.LOW: 1,
+}
+
+WEEK = cp_model.Domain(0, 10080 - 1)
+
+
+@dataclass
+class CompiledRule:
+    id: int
+    rule: ActivityRestriction
+    priority: Priority
+
+    @property
+    def mandatory(self) -> bool:
+        return self.priority == Priority.MANDATORY
+
+    @property
+    def weight(self) -> int:
+        return PRIORITY_WEIGHT.get(self.priority, 0)
+
+    def has_time_rule(self) -> bool:
+        r = self.rule
+        return any(x is not None for x in [r.earliest_start, r.latest_start, r.earliest_end, r.latest_end, r.on_day, r.not_on_day])
+
+    def has_resource_rule(self) -> bool:
+        r = self.rule
+        return r.venue_id is not None or r.instructor_id is not None or bool(r.tag)
+
+
+class RestrictionIndex:
+
+    def __init__(self, restrictions, tag_links):
+        """restrictions: Restriction rows, or rules compiled earlier (see compact)."""
+        self.by_activity: Dict[int, List[CompiledRule]] = defaultdict(list)
+        self.by_group: Dict[int, List[CompiledRule]] = defaultdict(list)
+        self.by_tag: Dict[int, List[CompiledRule]] = defaultdict(list)
+        self.general: List[CompiledRule] = []
+
+        # (entity_type, tag_id) -> entity ids, and activity id -> its tags
+        self.tagged: Dict[Tuple[str, int], Set[int]] = defaultdict(set)
+        self.activity_tags: Dict[int, Set[int]] = defaultdict(set)
+        for link in tag_links:
+            self.tagged[(link.entity_type, link.tag_id)].add(link.entity_id)
+            if link.entity_type == "activity":
+                self.activity_tags[link.entity_id].add(link.tag_id)
+
+        for r in restrictions:
+            compiled = r if isinstance(r, CompiledRule) else CompiledRule(id=r.id, rule=r.get_restriction(), priority=r.priority)
+            rule = compiled.rule
+            if rule.activity_id is not None:
+                self.by_activity[rule.activity_id].append(compiled)
+            elif rule.group_id is not None:
+                self.by_group[rule.group_id].append(compiled)
+            elif rule.activity_tag_id is not None:
+                self.by_tag[rule.activity_tag_id].append(compiled)
+            else:
+                self.general.append(compiled)
+
+    def rules_for(self, activity: Activity) -> List[CompiledRule]:
+        rules = self.by_activity.get(activity.id, []) + self.by_group.get(activity.group_id, []) + self.general
+        for tag_id in self.activity_tags.get(activity.id, ()):
+            rules = rules + self.by_tag.get(tag_id, [])
+        return rules
+
+    def allowed_starts(self, rule: CompiledRule, duration: int) -> cp_model.Domain:
+        """Start times a time rule allows, over the whole week."""
+        r = rule.rule
+        forbidden = []
+        for per_day, check in [(r.earliest_start, "earliest_start"), (r.latest_start, "latest_start"),
+                               (r.earliest_end, "earliest_end"), (r.latest_end, "latest_end")]:
+            for day, t in (per_day or {}).items():
+                minute = t.hour * 60 + t.minute
+                for d in expand_day(day):
+                    midnight = d * 1440
+                    if check == "earliest_start":
+                        forbidden.append([midnight, midnight + minute - 1])
+                    elif check == "latest_start":
+                        forbidden.append([midnight + minute + 1, midnight + 1439])
+                    elif check == "earliest_end":
+                        forbidden.append([midnight, midnight + minute - duration - 1])
+                    else:
+                        forbidden.append([midnight + minute - duration + 1, midnight + 1439])
+        if r.on_day:
+            allowed_days = {d for day in r.on_day for d in expand_day(day)}
+            forbidden += [[d * 1440, d * 1440 + 1439] for d in range(7) if d not in allowed_days]
+        for day in r.not_on_day or []:
+            forbidden += [[d * 1440, d * 1440 + 1439] for d in expand_day(day)]
+
+        forbidden = [f for f in forbidden if f[0] <= f[1]]
+        if not forbidden:
+            return WEEK
+        return WEEK.intersection_with(cp_model.Domain.FromIntervals(forbidden).complement())
+
+    def hard_start_domain(self, activity: Activity, domain: cp_model.Domain) -> cp_model.Domain:
+        """Prune a start domain with the activity's mandatory time rules."""
+        for rule in self.rules_for(activity):
+            if rule.mandatory and rule.has_time_rule():
+                domain = domain.intersection_with(self.allowed_starts(rule, activity.duration_minutes))
+        return domain
+
+    def soft_rules(self, activity: Activity) -> List[CompiledRule]:
+        return [rule for rule in self.rules_for(activity) if not rule.mandatory]
@@ -0,0 +1,102 @@
+"""
+Storage of solved timetables.
+
+A Schedule row holds the run (compressed proto, statistics), its events live in the scheduled_event
+table and are written with one bulk insert. Queries here never load the proto or legacy result
+columns unless asked to, so listing history costs the same however large the models are, and
+only the newest SCHEDULE_RETENTION schedules are kept.
+"""
+import json
+import os
+import zlib
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.orm import defer
+from sqlmodel import Session, select
+
+from db import get_session
+from models import Schedule, ScheduledEvent, ScheduledEventRecord, SolveJob
+
+
+SCHEDULE_RETENTION = int(os.environ.get("SCHEDULE_RETENTION", 50))  # 0 keeps every schedule
+
+# Schedule without the large columns
+_summary = select(Schedule).options(defer(Schedule.proto), defer(Schedule.result))
+
+
+def save_schedule(session: Session, events: List[ScheduledEvent], proto: Optional[bytes], stats: dict,
+                  retention: int = SCHEDULE_RETENTION) -> Schedule:
+    """Add a Schedule and its events to the session and prune old schedules, the caller commits."""
+    schedule = Schedule(proto=zlib.compress(proto) if proto else None, stats=json.dumps(stats))
+    session.add(schedule)
+    session.flush()
+    if events:
+        # executemany on the Core table, no ORM object per event
+        session.execute(insert(ScheduledEventRecord), [dict(e.to_dict(), schedule_id=schedule.id) for e in events])
+    if retention:
+        prune_schedules(session, retention)
+    return schedule
+
+
+def prune_schedules(session: Session, keep: int):
+    """Delete all but the newest keep schedules, their events go with them (ON DELETE CASCADE)."""
+    kept = select(Schedule.id).order_by(Schedule.created.desc(), Schedule.id.desc()).limit(keep)
+    old = select(Schedule.id).where(Schedule.id.not_in(kept))
+    session.execute(update(SolveJob).where(SolveJob.schedule_id.in_(old)).values(schedule_id=None))
+    session.execute(delete(Schedule).where(Schedule.id.in_(old)))
+
+
+def latest_schedule() -> Schedule | None:
+    with get_session() as session:
+        return session.exec(_summary.order_by(Schedule.created.desc(), Schedule.id.desc())).first()
+
+
+def schedule_history(page: int = 0, page_size: int = 20) -> List[Schedule]:
+    """Schedules newest first, page counted from 0."""
+    with get_session() as session:
+        return session.exec(
+            _summary.order_by(Schedule.created.desc(), Schedule.id.desc()).offset(page * page_size).limit(page_size)
+        ).all()
+
+
+def count_schedules() -> int:
+    with get_session() as session:
+        return session.exec(select(func.count(Schedule.id))).one()
+
+
+def load_proto(schedule_id: int) -> Optional[bytes]:
+    """Serialized CpModelProto of a schedule."""
+    with get_session() as session:
+        proto = session.exec(select(Schedule.proto).where(Schedule.id == schedule_id)).first()
+    if not proto:
+        return None
+    try:
+        return zlib.decompress(proto)
+    except zlib.error:
+        return proto  # Stored before compression
+
+
+def schedule_events(schedule_id: int, group_id: int = None, instructor_id: int = None, venue_id: int = None) -> List[ScheduledEvent]:
+    """Events of a schedule, optionally only those of one group, instructor or venue."""
+    query = select(ScheduledEventRecord).where(ScheduledEventRecord.schedule_id == schedule_id)
+    if group_id is not None:
+        query = query.where(ScheduledEventRecord.group_id == group_id)
+    if instructor_id is not None:
+        query = query.where(ScheduledEventRecord.instructor_id == instructor_id)
+    if venue_id is not None:
+        query = query.where(ScheduledEventRecord.venue_id == venue_id)
+    with get_session() as session:
+        events = [r.to_event() for r in session.exec(query.order_by(ScheduledEventRecord.id))]
+        if not events and group_id is None and instructor_id is None and venue_id is None:
+            # Schedules saved before the scheduled_event table keep their events as JSON
+            result = session.exec(select(Schedule.result).where(Schedule.id == schedule_id)).first()
+            if result:
+                events = [ScheduledEvent(**e) for e in json.loads(result).values()]
+        return events
+
+
+def latest_events(**filters) -> List[ScheduledEvent]:
+    """Events of the latest schedule, filters as in schedule_events."""
+    schedule = latest_schedule()
+    return schedule_events(schedule.id, **filters) if schedule is not None else []
@@ -0,0 +1,40 @@
+"""
+Auto-Plan controls shared by the sidebar of the Scheduling Parameters and Solve Jobs pages.
+"""
+from typing import Tuple
+
+import streamlit as st
+
+from db import fetch_objs
+from jobs import load_instance, submit_solve_job
+from models import SolverProfile
+from opt import Instance
+from precheck import PrecheckReport, check_instance
+
+
+def auto_plan_sidebar(link_jobs_page: bool = True) -> Tuple[Instance, PrecheckReport]:
+    """
+    Warm start, disruption and solver profile options, the pre-solve check and the Auto-Plan button.
+    Returns the planning data and its check report for the page to reuse.
+    """
+    warm_start = st.sidebar.checkbox("Start from the latest timetable", value=True, help="Use the latest timetable as a starting point, re-plans after small edits finish much faster.")
+    keep_stable = st.sidebar.checkbox("Minimal disruption", value=False, disabled=not warm_start, help="Avoid moving events away from their slot in the latest timetable.")
+    profiles = {p.name: p.id for p in fetch_objs(SolverProfile)}
+    profile_name = st.sidebar.selectbox("Solver profile", options=list(profiles), help="Quick preview for interactive use, Overnight for batch runs, Deterministic to reproduce a result.")
+    # 📌 Check the data fits before starting a solve
+    instance = load_instance()
+    report = check_instance(instance)
+    solve_anyway = False
+    if not report.ok:
+        st.sidebar.error("The planning data cannot be planned in full:\n\n" + "\n".join(f"- {e}" for e in report.errors()))
+        solve_anyway = st.sidebar.checkbox("Plan anyway", help="The solver plans as many sessions as fit.")
+    if st.sidebar.button("Auto-Plan", disabled=not (report.ok or solve_anyway)):
+        job_id = submit_solve_job(
+            warm_start=warm_start,
+            disruption_weight=1 if warm_start and keep_stable else 0,
+            solver_profile_id=profiles.get(profile_name),
+        )
+        st.sidebar.success(f"Solve job #{job_id} queued.")
+        if link_jobs_page:
+            st.sidebar.page_link("pages/5_Solve_Jobs.py", label="Follow progress", icon="⏳")
+    return instance, report
@@ -0,0 +1,59 @@
+"""
+Instance snapshots: the planning data of one client as a JSON file (gzip compressed when the name ends
+in .gz), so a solve can run without the database, e.g. offline or in a nightly batch.
+"""
+import gzip
+import json
+from dataclasses import fields
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from models import Activity, DayPlanningTimePeriod, Group, Instructor, Restriction, ScheduledEvent, TagLink, Unavailability, Venue
+from opt import Instance
+
+SNAPSHOT_FORMAT = 1
+
+MODELS = {
+    "groups": Group,
+    "instructors": Instructor,
+    "venues": Venue,
+    "activities": Activity,
+    "opening_times": DayPlanningTimePeriod,
+    "tag_links": TagLink,
+    "restrictions": Restriction,
+    "unavailability": Unavailability,
+}
+
+
+def instance_to_dict(instance: Instance, previous: Optional[List[ScheduledEvent]] = None) -> dict:
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "created": datetime.utcnow().isoformat(),
+        "instance": {f.name: [row.model_dump(mode="json") for row in getattr(instance, f.name)] for f in fields(Instance)},
+        "previous": [e.to_dict() for e in previous] if previous else None,
+    }
+
+
+def instance_from_dict(data: dict) -> Tuple[Instance, Optional[List[ScheduledEvent]]]:
+    """The instance and the previous timetable, if the snapshot has one."""
+    if data.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {data.get('format')}, expected {SNAPSHOT_FORMAT}")
+    instance = Instance(**{
+        name: [MODELS[name].model_validate(row) for row in data["instance"].get(name, [])] for name in MODELS
+    })
+    previous = [ScheduledEvent(**e) for e in data["previous"]] if data.get("previous") else None
+    return instance, previous
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def write_snapshot(path: str, instance: Instance, previous: Optional[List[ScheduledEvent]] = None):
+    with _open(path, "w") as f:
+        json.dump(instance_to_dict(instance, previous), f)
+
+
+def read_snapshot(path: str) -> Tuple[Instance, Optional[List[ScheduledEvent]]]:
+    with _open(path, "r") as f:
+        return instance_from_dict(json.load(f))